@@ -0,0 +1,134 @@
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from db_funcs import DATABASE_URL, DB_POOL_TIMEOUT_SECONDS, DB_POOL_RECYCLE_SECONDS, DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS
+from db_funcs import orders_at_stage_statement, find_buy_order_statement, find_bought_order_statement, find_sold_order_statement, find_sell_order_statement
+from db_funcs import insert_events_statement, order_state_upsert_statement, NOTIFY_EVENTS_SQL, notify_events_params, user_wallet_statement, all_orders_statement
+from db_funcs import invalidate_order_history, cached_wallet, cache_wallet, start_cache_invalidation_listener
+from contextlib import asynccontextmanager
+import os
+
+# Async twins of the db_funcs helpers, for coroutines that should not hold a
+# thread per query. Statements are shared with db_funcs, so both paths hit
+# the same indexes and keep order_state and the NOTIFY channels in sync.
+
+ASYNC_DATABASE_URL = DATABASE_URL.set(drivername="postgresql+asyncpg")
+
+# Separate budget from the sync engine's DB_POOL_SIZE/DB_MAX_OVERFLOW: a
+# process can hold the sum of both pools, so size the two together
+ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", "5"))
+ASYNC_DB_MAX_OVERFLOW = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "5"))
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=ASYNC_DB_POOL_SIZE,
+    max_overflow=ASYNC_DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    connect_args={'server_settings': {'statement_timeout': str(DB_STATEMENT_TIMEOUT_MS)}},
+)
+AsyncSession = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+@asynccontextmanager
+async def session_scope():
+    # Commits on success, rolls back and re-raises on error, always closes
+    async with AsyncSession() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+async def insert_events(rows):
+    """
+    Async insert_events: one multi-row INSERT ... RETURNING and a single commit.
+
+    Returns:
+        list: the inserted events as dicts, in the order of rows, or None on failure
+    """
+    if not rows:
+        return []
+
+    try:
+        async with session_scope() as session:
+            new_events = (await session.scalars(insert_events_statement(), rows)).all()
+            upsert = order_state_upsert_statement(new_events)
+            if upsert is not None:
+                await session.execute(upsert)
+            await session.execute(NOTIFY_EVENTS_SQL, notify_events_params(
+                [e.event for e in new_events], [e.user_id for e in new_events]
+            ))
+            new_events = [e.as_dict for e in new_events]
+    except Exception as e:
+        print(f"Failed to insert events: {e}")
+        return None
+
+    for user_id in {e['user_id'] for e in new_events}:
+        invalidate_order_history(user_id)
+    return new_events
+
+async def insert_event(**kwargs):
+    new_events = await insert_events([kwargs])
+    if new_events is None:
+        return None
+    return new_events[0]
+
+async def get_orders_at_stage(*stages):
+    async with AsyncSession() as session:
+        events = (await session.scalars(orders_at_stage_statement(*stages))).all()
+        return [e.as_dict for e in events]
+
+async def get_qualified_bids():
+    return await get_orders_at_stage("USDC_RECEIVED")
+
+async def get_qualified_asks():
+    return await get_orders_at_stage("DSPY_RECEIVED")
+
+async def get_qualified_mints():
+    return await get_orders_at_stage("SPY_ETF_PURCHASED")
+
+async def get_qualified_burns():
+    return await get_orders_at_stage("SPY_ETF_SOLD")
+
+async def get_qualified_redemptions():
+    return await get_orders_at_stage("DSPY_TOKEN_BURNED")
+
+async def get_unfilled_orders():
+    return await get_orders_at_stage("SPY_BUY_ORDER_CREATED", "SPY_SELL_ORDER_CREATED")
+
+async def find_event(statement):
+    async with AsyncSession() as session:
+        event = (await session.scalars(statement)).first()
+        return event.as_dict if event else None
+
+async def find_buy_order(frontend_hash, user_usdc_wallet_address):
+    return await find_event(find_buy_order_statement(frontend_hash, user_usdc_wallet_address))
+
+async def find_bought_order(frontend_hash, user_dspy_wallet_address):
+    return await find_event(find_bought_order_statement(frontend_hash, user_dspy_wallet_address))
+
+async def find_sold_order(frontend_hash):
+    return await find_event(find_sold_order_statement(frontend_hash))
+
+async def find_sell_order(frontend_hash, user_dspy_wallet_address):
+    return await find_event(find_sell_order_statement(frontend_hash, user_dspy_wallet_address))
+
+async def get_user_wallet_address(user_id):
+    # Shares db_funcs' wallet cache and its invalidation listener
+    start_cache_invalidation_listener()
+
+    wallet, version = cached_wallet(user_id)
+    if wallet is not None:
+        return wallet
+
+    async with AsyncSession() as session:
+        wallet = (await session.scalars(user_wallet_statement(user_id))).first()
+        wallet = wallet.as_dict if wallet else None
+
+    cache_wallet(user_id, wallet, version)
+    return wallet
+
+async def get_all_orders(user_id):
+    async with AsyncSession() as session:
+        result = await session.execute(all_orders_statement(), {'user_id': user_id})
+        return [dict(row) for row in result.mappings().all()]
@@ -1,5 +1,9 @@
 import os
 import json
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
 from web3 import Web3
 from web3.exceptions import ContractLogicError
 from dotenv import load_dotenv
@@ -17,13 +21,242 @@ USDC_ADDRESS = os.getenv("USDC_ADDRESS")
 with open("abi/TokenIssuerABI.json") as TokenIssuerABI_file:
     TOKEN_ISSUER_ABI = json.load(TokenIssuerABI_file)
 
+def batch_function_abi(name):
+    return {
+        'inputs': [
+            {'internalType': 'address[]', 'name': 'users', 'type': 'address[]'},
+            {'internalType': 'uint256[]', 'name': 'tokenAmounts', 'type': 'uint256[]'},
+            {'internalType': 'bytes32[]', 'name': 'frontendHashes', 'type': 'bytes32[]'},
+        ],
+        'name': name,
+        'outputs': [],
+        'stateMutability': 'nonpayable',
+        'type': 'function',
+    }
+
+TOKEN_ISSUER_BATCH_ABI = [batch_function_abi('batchMint'), batch_function_abi('batchBurn')]
+
 with open("abi/TransactionGatewayABI.json", "r") as TransactionGatewayABI_file:
     GATEWAY_ABI = json.load(TransactionGatewayABI_file)
 
 with open("abi/USDCABI.json", "r") as USDCABI_file:
     USDC_ABI = json.load(USDCABI_file)
 
-def mint(user_address, token_amount, frontend_hash):
+# Comma separated, in order of preference
+RPC_URLS = [url.strip() for url in os.getenv("RPC_URLS", "https://sepolia.base.org").split(",") if url.strip()]
+RPC_POOL_SIZE = int(os.getenv("RPC_POOL_SIZE", "16"))
+RPC_TIMEOUT_SECONDS = float(os.getenv("RPC_TIMEOUT_SECONDS", "10"))
+RPC_UNHEALTHY_SECONDS = float(os.getenv("RPC_UNHEALTHY_SECONDS", "30"))
+# How long a sent nonce may stay missing from the node before it counts as dropped
+NONCE_GAP_TIMEOUT_SECONDS = float(os.getenv("NONCE_GAP_TIMEOUT_SECONDS", "120"))
+RECEIPT_BATCH_SIZE = int(os.getenv("RECEIPT_BATCH_SIZE", "100"))
+# batchMint / batchBurn are not part of the deployed TokenIssuer; only turn
+# this on against a TokenIssuer deployment that exposes them as below
+TOKEN_ISSUER_BATCH_ENABLED = os.getenv("TOKEN_ISSUER_BATCH_ENABLED", "false").lower() == "true"
+# Gas limit for a batch mint/burn is the base plus this much per order
+BATCH_BASE_GAS = int(os.getenv("BATCH_BASE_GAS", "60000"))
+BATCH_GAS_PER_ORDER = int(os.getenv("BATCH_GAS_PER_ORDER", "90000"))
+
+def build_rpc_client(rpc_url):
+    # Keep-alive session and pre-built contracts, reused for every transaction
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=RPC_POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    w3 = Web3(Web3.HTTPProvider(rpc_url, session=session, request_kwargs={'timeout': RPC_TIMEOUT_SECONDS}))
+
+    return {
+        'url': rpc_url,
+        'session': session,
+        'w3': w3,
+        'token_issuer': w3.eth.contract(
+            address=TOKEN_ISSUER_ADDRESS,
+            abi=TOKEN_ISSUER_ABI + TOKEN_ISSUER_BATCH_ABI if TOKEN_ISSUER_BATCH_ENABLED else TOKEN_ISSUER_ABI
+        ),
+        'gateway': w3.eth.contract(address=TRANSACTIONGATEWAY_ADDRESS, abi=GATEWAY_ABI),
+        'usdc': w3.eth.contract(address=USDC_ADDRESS, abi=USDC_ABI),
+        'unhealthy_until': 0,
+    }
+
+rpc_clients = [build_rpc_client(rpc_url) for rpc_url in RPC_URLS]
+
+def get_rpc_client():
+    now = time.monotonic()
+    for client in rpc_clients:
+        if client['unhealthy_until'] <= now:
+            return client
+    # Every endpoint is cooling down, use the one that recovers first
+    return min(rpc_clients, key=lambda c: c['unhealthy_until'])
+
+# The endpoint did not answer; whatever was sent may or may not have arrived
+TRANSPORT_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+def call_with_failover(func):
+    last_error = None
+    for _ in range(len(rpc_clients)):
+        client = get_rpc_client()
+        try:
+            return func(client)
+        except TRANSPORT_ERRORS as e:
+            client['unhealthy_until'] = time.monotonic() + RPC_UNHEALTHY_SECONDS
+            print(f"[WARN] RPC endpoint {client['url']} unavailable, failing over: {e}")
+            last_error = e
+    raise last_error
+
+# Admin wallet nonces are handed out locally so many transactions can be in
+# flight at once; the node is only asked on startup and after errors.
+nonce_lock = threading.Lock()
+# tx_hashes maps each nonce to the hash last sent with it, so a filled gap can
+# report which transaction it replaced
+nonce_state = {'next': None, 'gaps': set(), 'sent_at': {}, 'tx_hashes': {}}
+
+def resync_nonce(client):
+    pending = client['w3'].eth.get_transaction_count(WALLET_ADDRESS_ADMIN, 'pending')
+    with nonce_lock:
+        # Never move backwards: nonces above a gap are already queued on the node
+        if nonce_state['next'] is None or pending > nonce_state['next']:
+            nonce_state['next'] = pending
+        nonce_state['gaps'] = {n for n in nonce_state['gaps'] if n >= pending}
+    return pending
+
+def allocate_nonce(client):
+    if nonce_state['next'] is None:
+        resync_nonce(client)
+    with nonce_lock:
+        nonce = nonce_state['next']
+        nonce_state['next'] += 1
+        nonce_state['sent_at'][nonce] = time.monotonic()
+    return nonce
+
+def release_nonce(nonce):
+    # Called when a transaction never reached the node
+    with nonce_lock:
+        nonce_state['sent_at'].pop(nonce, None)
+        if nonce == nonce_state['next'] - 1:
+            nonce_state['next'] -= 1
+        else:
+            nonce_state['gaps'].add(nonce)
+
+def fill_nonce_gaps(client):
+    # Returns {tx_hash: nonce} of the sent transactions whose nonce was filled;
+    # they were dropped or are now outbid and must not be waited on forever
+    w3 = client['w3']
+    pending = w3.eth.get_transaction_count(WALLET_ADDRESS_ADMIN, 'pending')
+    now = time.monotonic()
+
+    with nonce_lock:
+        nonce_state['gaps'] = {n for n in nonce_state['gaps'] if n >= pending}
+        for n in [n for n in nonce_state['sent_at'] if n < pending]:
+            del nonce_state['sent_at'][n]
+        for n in [n for n in nonce_state['tx_hashes'] if n < pending]:
+            del nonce_state['tx_hashes'][n]
+        gaps = set(nonce_state['gaps'])
+        # The node's pending count stops at the first nonce it has never seen;
+        # if we sent that one a while ago it was dropped from the mempool
+        if nonce_state['next'] is not None and pending < nonce_state['next']:
+            sent_at = nonce_state['sent_at'].get(pending)
+            if sent_at is None or now - sent_at > NONCE_GAP_TIMEOUT_SECONDS:
+                gaps.add(pending)
+
+    replaced = {}
+    for nonce in sorted(gaps):
+        try:
+            # Zero value self-transfer, priced above our usual 1 gwei so it
+            # also replaces anything stuck at that nonce
+            filler_txn = {
+                'chainId': CHAIN_ID,
+                'to': WALLET_ADDRESS_ADMIN,
+                'value': 0,
+                'gas': 21000,
+                'gasPrice': w3.to_wei('2', 'gwei'),
+                'nonce': nonce
+            }
+            signed_txn = w3.eth.account.sign_transaction(filler_txn, private_key=PRIVATE_KEY_ADMIN)
+            w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+            print(f"[WARN] Filled nonce gap {nonce}")
+            with nonce_lock:
+                nonce_state['gaps'].discard(nonce)
+                nonce_state['sent_at'][nonce] = time.monotonic()
+                tx_hash = nonce_state['tx_hashes'].pop(nonce, None)
+            if tx_hash is not None:
+                replaced[tx_hash] = nonce
+        except Exception as e:
+            print(f"[ERROR] Failed to fill nonce gap {nonce}: {e}")
+
+    return replaced
+
+def get_mined_nonce():
+    # Nonces below this are final: whatever was mined at them can no longer change
+    return call_with_failover(lambda c: c['w3'].eth.get_transaction_count(WALLET_ADDRESS_ADMIN, 'latest'))
+
+def is_nonce_error(error):
+    message = str(error).lower()
+    return 'nonce too low' in message or 'nonce has already been used' in message
+
+def sign_admin_transaction(client, contract_name, function_name, args, gas, nonce):
+    w3 = client['w3']
+    contract = client[contract_name]
+    txn = getattr(contract.functions, function_name)(*args).build_transaction({
+        'chainId': CHAIN_ID,
+        'gas': gas,
+        'gasPrice': w3.to_wei('1', 'gwei'),
+        'nonce': nonce
+    })
+    return w3.eth.account.sign_transaction(txn, private_key=PRIVATE_KEY_ADMIN)
+
+def abandon_nonce(nonce):
+    # The transaction at this nonce never reached the node
+    release_nonce(nonce)
+    try:
+        fill_nonce_gaps(get_rpc_client())
+    except Exception as fill_error:
+        print(f"[ERROR] Nonce gap check failed: {fill_error}")
+
+def prepare_admin_transaction(contract_name, function_name, *args, gas=150000):
+    """
+    Signs an admin transaction without sending it, so its hash can be
+    recorded before the transaction can land.
+
+    Returns:
+        dict: {'nonce', 'tx_hash', 'raw_transaction'}; hand it to
+        send_prepared_transaction, or to abandon_nonce(prepared['nonce'])
+        if it will not be sent
+    """
+    nonce = allocate_nonce(get_rpc_client())
+    try:
+        signed_txn = call_with_failover(lambda c: sign_admin_transaction(c, contract_name, function_name, args, gas, nonce))
+    except Exception:
+        abandon_nonce(nonce)
+        raise
+    return {'nonce': nonce, 'tx_hash': Web3.to_hex(signed_txn.hash), 'raw_transaction': signed_txn.raw_transaction}
+
+def send_prepared_transaction(prepared):
+    # Resending the same signed bytes to another endpoint is harmless, so the
+    # send fails over; the nonce is only given up once a node rejected it
+    nonce = prepared['nonce']
+    try:
+        call_with_failover(lambda c: c['w3'].eth.send_raw_transaction(prepared['raw_transaction']))
+    except Exception as e:
+        if is_nonce_error(e):
+            # Another transaction took the nonce, so this one can never be mined
+            print(f"[WARN] Nonce {nonce} rejected, resyncing: {e}")
+            resync_nonce(get_rpc_client())
+        elif isinstance(e, TRANSPORT_ERRORS):
+            # No answer is not a rejection: the transaction may be in a mempool.
+            # Keep the nonce; if it never lands, fill_nonce_gaps replaces it
+            # and reports the hash so its orders are requeued.
+            print(f"[WARN] Send of {prepared['tx_hash']} at nonce {nonce} unconfirmed: {e}")
+            with nonce_lock:
+                nonce_state['tx_hashes'][nonce] = prepared['tx_hash']
+        else:
+            abandon_nonce(nonce)
+        raise
+    with nonce_lock:
+        nonce_state['tx_hashes'][nonce] = prepared['tx_hash']
+    return prepared['tx_hash']
+
+def prepare_mint(user_address, token_amount, frontend_hash):
     if not user_address:
         print("[ERROR] No user address provided.")
         return
@@ -36,34 +269,20 @@ def mint(user_address, token_amount, frontend_hash):
         print("[ERROR] No frontend hash provided.")
         return
 
-    w3 = Web3(Web3.HTTPProvider("https://sepolia.base.org"))
+    return prepare_admin_transaction('token_issuer', 'mint', user_address, token_amount, frontend_hash)
 
-    token_issuer = w3.eth.contract(address=TOKEN_ISSUER_ADDRESS, abi=TOKEN_ISSUER_ABI)
-
-    nonce = w3.eth.get_transaction_count(WALLET_ADDRESS_ADMIN)
-    mint_txn = token_issuer.functions.mint(
-        user_address,
-        token_amount,
-        frontend_hash
-    ).build_transaction({
-        'chainId': CHAIN_ID,
-        'gas': 150000,
-        'gasPrice': w3.to_wei('1', 'gwei'),
-        'nonce': nonce
-    })
-
-    signed_txn = w3.eth.account.sign_transaction(mint_txn, private_key=PRIVATE_KEY_ADMIN)
-    tx_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+def mint(user_address, token_amount, frontend_hash):
+    prepared = prepare_mint(user_address, token_amount, frontend_hash)
+    if prepared is None:
+        return
 
-    print(f"✅ Mint tx sent: {w3.to_hex(tx_hash)}")
-    print("⏳ Waiting for receipt...")
+    tx_hash = send_prepared_transaction(prepared)
 
-    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-    print("🎉 Mint executed successfully!" if receipt['status'] == 1 else "❌ Transaction failed.")
+    print(f"✅ Mint tx sent: {tx_hash}")
 
-    return receipt
+    return tx_hash
 
-def burn(admin_address, token_amount, frontend_hash):
+def prepare_burn(admin_address, token_amount, frontend_hash):
     if not admin_address:
         print("[ERROR] No admin address provided.")
         return
@@ -76,92 +295,179 @@ def burn(admin_address, token_amount, frontend_hash):
         print("[ERROR] No frontend hash provided.")
         return
 
-    w3 = Web3(Web3.HTTPProvider("https://sepolia.base.org"))
+    return prepare_admin_transaction('token_issuer', 'burn', admin_address, token_amount, frontend_hash)
 
-    token_issuer = w3.eth.contract(address=TOKEN_ISSUER_ADDRESS, abi=TOKEN_ISSUER_ABI)
+def burn(admin_address, token_amount, frontend_hash):
+    prepared = prepare_burn(admin_address, token_amount, frontend_hash)
+    if prepared is None:
+        return
 
-    nonce = w3.eth.get_transaction_count(WALLET_ADDRESS_ADMIN)
-    burn_txn = token_issuer.functions.burn(
-        admin_address,
-        token_amount,
-        frontend_hash
-    ).build_transaction({
-        'chainId': CHAIN_ID,
-        'gas': 150000,
-        'gasPrice': w3.to_wei('1', 'gwei'),
-        'nonce': nonce
-    })
+    tx_hash = send_prepared_transaction(prepared)
 
-    signed_txn = w3.eth.account.sign_transaction(burn_txn, private_key=PRIVATE_KEY_ADMIN)
-    tx_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+    print(f"✅ Burn tx sent: {tx_hash}")
 
-    print(f"✅ Burn tx sent: {w3.to_hex(tx_hash)}")
-    print("⏳ Waiting for receipt...")
+    return tx_hash
 
-    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-    print("🎉 Burn executed successfully!" if receipt['status'] == 1 else "❌ Transaction failed.")
+def prepare_batch_mint(user_addresses, token_amounts, frontend_hashes):
+    if not TOKEN_ISSUER_BATCH_ENABLED:
+        print("[ERROR] TokenIssuer batch functions are not enabled.")
+        return
 
-    return receipt
+    if not user_addresses or len(user_addresses) != len(token_amounts) or len(user_addresses) != len(frontend_hashes):
+        print("[ERROR] Batch mint arguments do not line up.")
+        return
 
-def transfer_usdc(user_address, token_amount):
-	if not user_address:
-		print("[ERROR] No user address provided.")
-		return
+    if any(not token_amount or token_amount <= 0 for token_amount in token_amounts):
+        print("[ERROR] Invalid token amount in batch.")
+        return
 
-	if not token_amount or token_amount <= 0:
-		print("[ERROR] Invalid token amount.")
-		return
+    gas = BATCH_BASE_GAS + BATCH_GAS_PER_ORDER * len(user_addresses)
+    return prepare_admin_transaction('token_issuer', 'batchMint', user_addresses, token_amounts, frontend_hashes, gas=gas)
 
-	w3 = Web3(Web3.HTTPProvider("https://sepolia.base.org"))
+def batch_mint(user_addresses, token_amounts, frontend_hashes):
+    prepared = prepare_batch_mint(user_addresses, token_amounts, frontend_hashes)
+    if prepared is None:
+        return
+
+    tx_hash = send_prepared_transaction(prepared)
 
-	usdc = w3.eth.contract(address=USDC_ADDRESS, abi=USDC_ABI)
+    print(f"✅ Batch mint tx sent for {len(user_addresses)} orders: {tx_hash}")
 
-	sender_balance = usdc.functions.balanceOf(WALLET_ADDRESS_ADMIN).call()
-	print(f"Sender balance: {sender_balance}")
+    return tx_hash
 
-	if sender_balance < token_amount:
-		print(f"[ERROR] Insufficient balance. Required: {token_amount}, Available: {sender_balance}")
+def prepare_batch_burn(admin_address, token_amounts, frontend_hashes):
+    if not TOKEN_ISSUER_BATCH_ENABLED:
+        print("[ERROR] TokenIssuer batch functions are not enabled.")
+        return
+
+    if not admin_address:
+        print("[ERROR] No admin address provided.")
+        return
+
+    if not token_amounts or len(token_amounts) != len(frontend_hashes):
+        print("[ERROR] Batch burn arguments do not line up.")
+        return
+
+    if any(not token_amount or token_amount <= 0 for token_amount in token_amounts):
+        print("[ERROR] Invalid token amount in batch.")
+        return
+
+    gas = BATCH_BASE_GAS + BATCH_GAS_PER_ORDER * len(token_amounts)
+    admin_addresses = [admin_address] * len(token_amounts)
+    return prepare_admin_transaction('token_issuer', 'batchBurn', admin_addresses, token_amounts, frontend_hashes, gas=gas)
+
+def batch_burn(admin_address, token_amounts, frontend_hashes):
+    prepared = prepare_batch_burn(admin_address, token_amounts, frontend_hashes)
+    if prepared is None:
+        return
+
+    tx_hash = send_prepared_transaction(prepared)
+
+    print(f"✅ Batch burn tx sent for {len(token_amounts)} orders: {tx_hash}")
+
+    return tx_hash
+
+def prepare_usdc_transfer(user_address, token_amount):
+    if not user_address:
+        print("[ERROR] No user address provided.")
+        return
+
+    if not token_amount or token_amount <= 0:
+        print("[ERROR] Invalid token amount.")
+        return
+
+    sender_balance = call_with_failover(lambda c: c['usdc'].functions.balanceOf(WALLET_ADDRESS_ADMIN).call())
+    print(f"Sender balance: {sender_balance}")
+
+    if sender_balance < token_amount:
+        print(f"[ERROR] Insufficient balance. Required: {token_amount}, Available: {sender_balance}")
+        return
+
+    return prepare_admin_transaction('usdc', 'transfer', user_address, token_amount)
+
+def transfer_usdc(user_address, token_amount):
+	prepared = prepare_usdc_transfer(user_address, token_amount)
+	if prepared is None:
 		return
 
-	nonce = w3.eth.get_transaction_count(WALLET_ADDRESS_ADMIN)
-	transfer_txn = usdc.functions.transfer(
-		user_address,
-		token_amount
-	).build_transaction({
-		'chainId': CHAIN_ID,
-		'gas': 150000,
-		'gasPrice': w3.to_wei('1', 'gwei'),
-		'nonce': nonce
-	})
-
-	signed_txn = w3.eth.account.sign_transaction(transfer_txn, private_key=PRIVATE_KEY_ADMIN)
-	tx_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
-
-	print(f"✅ Transfer tx sent: {w3.to_hex(tx_hash)}")
+	tx_hash = send_prepared_transaction(prepared)
+
+	print(f"✅ Transfer tx sent: {tx_hash}")
 	print(f"⏳ Transferring {token_amount} USDC to {user_address}...")
 
-	receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-
-	if receipt['status'] == 1:
-		print("🎉 Transfer successful!")
-		# Check new balances
-		new_sender_balance = usdc.functions.balanceOf(WALLET_ADDRESS_ADMIN).call()
-		recipient_balance = usdc.functions.balanceOf(user_address).call()
-		print(f"Sender balance now: {new_sender_balance}")
-		print(f"Recipient balance now: {recipient_balance}")
-	else:
-		print("❌ Transfer failed.")
-		# Try to get error reason
-		tx = w3.eth.get_transaction(tx_hash)
-		try:
-			w3.eth.call({
-				'to': tx['to'],
-				'from': tx['from'],
-				'data': tx['input'],
-				'value': tx['value'],
-				'gas': tx['gas']
-			}, block_identifier=tx['blockNumber'])
-		except web3.exceptions.ContractLogicError as e:
-			print(f"Revert reason: {e}")
-
-	return receipt
+	return tx_hash
+
+def fetch_rpc_batch(client, method, tx_hashes):
+    # One batched JSON-RPC request; unknown or pending hashes come back null
+    payload = [
+        {'jsonrpc': '2.0', 'id': i, 'method': method, 'params': [tx_hash]}
+        for i, tx_hash in enumerate(tx_hashes)
+    ]
+    response = client['session'].post(client['url'], json=payload, timeout=RPC_TIMEOUT_SECONDS)
+    response.raise_for_status()
+
+    results = {}
+    for item in response.json():
+        if item.get('result'):
+            results[tx_hashes[item['id']]] = item['result']
+    return results
+
+def fetch_rpc_batches(method, tx_hashes):
+    results = {}
+    for start in range(0, len(tx_hashes), RECEIPT_BATCH_SIZE):
+        batch = tx_hashes[start:start + RECEIPT_BATCH_SIZE]
+        results.update(call_with_failover(lambda c: fetch_rpc_batch(c, method, batch)))
+    return results
+
+def get_transaction_receipts(tx_hashes):
+    return fetch_rpc_batches('eth_getTransactionReceipt', tx_hashes)
+
+def get_transaction_nonces(tx_hashes):
+    # Nonces of the transactions the node knows about, mined or pending
+    transactions = fetch_rpc_batches('eth_getTransactionByHash', tx_hashes)
+    return {tx_hash: int(tx['nonce'], 16) for tx_hash, tx in transactions.items()}
+
+def receipt_succeeded(receipt):
+    return int(receipt['status'], 16) == 1
+
+def receipt_gas_paid(receipt):
+    # Gas cost in ETH
+    gas_wei = int(receipt['gasUsed'], 16) * int(receipt['effectiveGasPrice'], 16)
+    return Web3.from_wei(gas_wei, 'ether')
+
+def event_topic(abi, event_name):
+    for item in abi:
+        if item.get('type') == 'event' and item['name'] == event_name:
+            signature = f"{event_name}({','.join(i['type'] for i in item['inputs'])})"
+            return Web3.to_hex(Web3.keccak(text=signature))
+    raise ValueError(f"Event {event_name} not in ABI")
+
+MINT_PROCESSED_TOPIC = event_topic(TOKEN_ISSUER_ABI, 'MintProcessed')
+BURN_PROCESSED_TOPIC = event_topic(TOKEN_ISSUER_ABI, 'BurnProcessed')
+
+def processed_frontend_hashes(receipt, topic):
+    # frontendHash (bytes32, hex without 0x) of every MintProcessed/BurnProcessed
+    # log the token issuer emitted in this receipt
+    hashes = set()
+    for log in receipt['logs']:
+        if log['address'].lower() != TOKEN_ISSUER_ADDRESS.lower():
+            continue
+        if not log['topics'] or log['topics'][0].lower() != topic:
+            continue
+        # data = tokenAmount (32 bytes) + frontendHash (32 bytes)
+        hashes.add(log['data'][2 + 64:2 + 128].lower())
+    return hashes
+
+def print_revert_reason(tx_hash):
+    w3 = get_rpc_client()['w3']
+    tx = w3.eth.get_transaction(tx_hash)
+    try:
+        w3.eth.call({
+            'to': tx['to'],
+            'from': tx['from'],
+            'data': tx['input'],
+            'value': tx['value'],
+            'gas': tx['gas']
+        }, block_identifier=tx['blockNumber'])
+    except ContractLogicError as e:
+        print(f"Revert reason: {e}")
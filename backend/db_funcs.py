@@ -1,13 +1,23 @@
-from sqlalchemy import Column, BigInteger, DateTime, String, Numeric, text, desc, select
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import aliased, declarative_base
-from sqlalchemy import create_engine
+from sqlalchemy import Column, BigInteger, DateTime, String, Numeric, ForeignKey, Index, text, desc, select, insert, func, literal_column, tuple_, and_, or_
+from sqlalchemy.dialects.postgresql import UUID, insert as pg_insert
+from sqlalchemy.orm import declarative_base
+from sqlalchemy import create_engine, exc, inspect
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.engine import URL
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.sql import exists, not_
+from contextlib import contextmanager
 from sqlalchemy.sql.expression import TextualSelect
 from dotenv import load_dotenv
 import os
+import json
+import uuid
+import time
+import base64
+import select as io_select
+import threading
+from collections import OrderedDict
+from datetime import datetime
 
 load_dotenv()
 DATABASE_URL = URL.create(
@@ -18,14 +28,120 @@ DATABASE_URL = URL.create(
     port=os.getenv('PORT'),
     database=os.getenv('DBNAME')
 )
-engine = create_engine(DATABASE_URL)
+
+# Sized for the DB executor pool plus API traffic; tune with get_pool_metrics()
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+pool_metrics_lock = threading.Lock()
+pool_metrics = {
+    'checkouts': 0,
+    'wait_seconds_total': 0.0,
+    'wait_seconds_max': 0.0,
+    'overflow_events': 0,
+    'timeouts': 0,
+}
+
+class MeteredQueuePool(QueuePool):
+    # QueuePool that records how long each checkout waited for a connection
+    def _do_get(self):
+        overflow = self.overflow()
+        start = time.monotonic()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            with pool_metrics_lock:
+                pool_metrics['timeouts'] += 1
+            raise
+        waited = time.monotonic() - start
+        with pool_metrics_lock:
+            pool_metrics['checkouts'] += 1
+            pool_metrics['wait_seconds_total'] += waited
+            pool_metrics['wait_seconds_max'] = max(pool_metrics['wait_seconds_max'], waited)
+            if self.overflow() > overflow and self.overflow() > 0:
+                pool_metrics['overflow_events'] += 1
+        return conn
+
+engine = create_engine(
+    DATABASE_URL,
+    poolclass=MeteredQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    connect_args={'options': f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"},
+)
 Session = sessionmaker(bind=engine)
 
+@contextmanager
+def session_scope():
+    # Commits on success, rolls back and re-raises on error, always closes
+    session = Session()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+def get_pool_metrics():
+    pool = engine.pool
+    with pool_metrics_lock:
+        metrics = dict(pool_metrics)
+    checkouts = metrics['checkouts']
+    metrics['wait_seconds_avg'] = metrics['wait_seconds_total'] / checkouts if checkouts else 0.0
+    return {
+        'size': pool.size(),
+        'max_overflow': DB_MAX_OVERFLOW,
+        'checked_out': pool.checkedout(),
+        'checked_in': pool.checkedin(),
+        'overflow': max(pool.overflow(), 0),
+        **metrics,
+    }
+
+# insert_event publishes each new event type on this channel
+EVENTS_CHANNEL = "events"
+# ...and the user_id it belongs to on this one, for cache invalidation
+ORDER_UPDATES_CHANNEL = "order_updates"
+# update_or_create_user_wallet_address publishes "user_id|process id" here
+WALLET_UPDATES_CHANNEL = "wallet_updates"
+# Lets the listener skip wallet notifications this process raised itself
+PROCESS_ID = uuid.uuid4().hex
+
+ORDER_HISTORY_PAGE_SIZE = int(os.getenv("ORDER_HISTORY_PAGE_SIZE", "50"))
+ORDER_HISTORY_CACHE_USERS = int(os.getenv("ORDER_HISTORY_CACHE_USERS", "1000"))
+WALLET_CACHE_SIZE = int(os.getenv("WALLET_CACHE_SIZE", "10000"))
+WALLET_CACHE_TTL_SECONDS = float(os.getenv("WALLET_CACHE_TTL_SECONDS", "300"))
+
 Base = declarative_base()
 
+def event_partial_index(event_type, *columns):
+    # Index only the rows of one event type, matching the find_* lookups
+    return Index(
+        f"ix_events_{event_type.lower()}_hash", *columns,
+        postgresql_where=text(f"event = '{event_type}'"),
+        postgresql_concurrently=True
+    )
+
 class Event(Base):
     __tablename__ = 'events'
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        event_partial_index("BUY_ORDER_CREATED", 'frontend_hash', 'user_usdc_wallet_address'),
+        event_partial_index("SELL_ORDER_CREATED", 'frontend_hash', 'user_dspy_wallet_address'),
+        event_partial_index("SPY_ETF_PURCHASED", 'frontend_hash', 'user_dspy_wallet_address'),
+        event_partial_index("SPY_ETF_SOLD", 'frontend_hash'),
+        # Order history: DISTINCT ON (frontend_hash) ... ORDER BY frontend_hash, created_at DESC
+        Index('ix_events_user_history', 'user_id', 'frontend_hash', text('created_at DESC'),
+              postgresql_concurrently=True),
+        {'schema': 'public'},
+    )
 
     id = Column(BigInteger, primary_key=True,
                 server_default=text("nextval('events_id_seq'::regclass)"))
@@ -67,6 +183,29 @@ class Event(Base):
     def as_dict(self):
         return {c.name: getattr(self, c.name) for c in self.__table__.columns}
 
+class OrderState(Base):
+    # One row per order, pointing at the latest event written for it.
+    # Kept in sync by insert_events so the pipeline never has to scan events.
+    __tablename__ = 'order_state'
+    __table_args__ = (
+        Index('ix_order_state_stage', 'stage', postgresql_concurrently=True),
+        # Keyset pagination of a user's orders, newest first
+        Index('ix_order_state_user_history', 'user_id', text('updated_at DESC'), text('frontend_hash DESC'),
+              postgresql_concurrently=True),
+        {'schema': 'public'},
+    )
+
+    frontend_hash = Column(UUID(as_uuid=True), primary_key=True)
+    user_id = Column(String, nullable=False)
+    stage = Column(String, nullable=False)
+    last_event_id = Column(BigInteger, ForeignKey('public.events.id'), nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False,
+                        server_default=text("now()"))
+
+    @property
+    def as_dict(self):
+        return {c.name: getattr(self, c.name) for c in self.__table__.columns}
+
 class RegisteredWallet(Base):
     __tablename__ = 'registered_wallets'
     __table_args__ = {'schema': 'public'}
@@ -83,189 +222,389 @@ class RegisteredWallet(Base):
 def run_db_query(query_func, *args, **kwargs):
     #Function not currently used
     try:
-        with engine.connect():
-            with Session() as session:
-                result = query_func(session, *args, **kwargs)
-                return result
+        with session_scope() as session:
+            return query_func(session, *args, **kwargs)
     except Exception as e:
         print(f"Failed to connect or run query: {e}")
         return None
 
-def insert_event(**kwargs):
-    with Session() as session:
-        try:
-            new_event = Event(**kwargs)
-            session.add(new_event)
-            session.commit()
-            session.refresh(new_event)
-            return new_event.as_dict
-        except Exception as e:
-            session.rollback()
-            print(f"Failed to insert event: {e}")
-            return None
-
-def get_qualified_bids():
-    with Session() as session:
-        e2 = aliased(Event)
+def order_state_upsert_statement(events):
+    # ON CONFLICT can touch a row only once per statement, so keep each
+    # order's latest event of the batch
+    latest = {}
+    for event in events:
+        latest[event.frontend_hash] = event
+    if not latest:
+        return None
 
-        subquery = exists().where(
-            (e2.frontend_hash == Event.frontend_hash) &
-            ((e2.event == 'SPY_BUY_ORDER_CREATED') |
-             (e2.dspy_average_minting_price.isnot(None)))
-        )
+    stmt = pg_insert(OrderState).values([
+        {
+            'frontend_hash': event.frontend_hash,
+            'user_id': event.user_id,
+            'stage': event.event,
+            'last_event_id': event.id,
+            'updated_at': func.now(),
+        }
+        for event in latest.values()
+    ])
+    # A commit that lands after a newer one must not move the order backwards
+    return stmt.on_conflict_do_update(
+        index_elements=[OrderState.frontend_hash],
+        set_={
+            'stage': stmt.excluded.stage,
+            'last_event_id': stmt.excluded.last_event_id,
+            'updated_at': stmt.excluded.updated_at,
+        },
+        where=OrderState.last_event_id < stmt.excluded.last_event_id,
+    )
+
+def upsert_order_state(session, events):
+    stmt = order_state_upsert_statement(events)
+    if stmt is not None:
+        session.execute(stmt)
+
+NOTIFY_EVENTS_SQL = text(
+    "SELECT pg_notify(:events_channel, payload) FROM unnest(CAST(:event_types AS text[])) AS payload "
+    "UNION ALL "
+    "SELECT pg_notify(:updates_channel, payload) FROM unnest(CAST(:user_ids AS text[])) AS payload"
+)
 
-        events = session.query(Event).filter(
-            Event.event == "USDC_RECEIVED",
-            not_(subquery)
-        ).all()
-        events = [e.as_dict for e in events]
-        return (events)
+def notify_events_params(event_types, user_ids):
+    return {'events_channel': EVENTS_CHANNEL, 'event_types': sorted(set(event_types)),
+            'updates_channel': ORDER_UPDATES_CHANNEL, 'user_ids': sorted(set(user_ids))}
+
+def notify_events(session, event_types, user_ids):
+    # Postgres delivers the notifications only once the transaction commits,
+    # and folds identical ones raised in the same transaction
+    session.execute(NOTIFY_EVENTS_SQL, notify_events_params(event_types, user_ids))
+
+def open_event_listener(*channels):
+    # Dedicated (unpooled) autocommit connection subscribed to the given channels
+    cargs, cparams = engine.dialect.create_connect_args(engine.url)
+    conn = engine.dialect.connect(*cargs, **cparams)
+    conn.set_session(autocommit=True)
+    with conn.cursor() as cursor:
+        for channel in (channels or (EVENTS_CHANNEL,)):
+            cursor.execute(f"LISTEN {channel}")
+    return conn
+
+def read_notifications(conn):
+    conn.poll()
+    notifications = [(n.channel, n.payload) for n in conn.notifies]
+    conn.notifies.clear()
+    return notifications
+
+ORDER_STATE_BACKFILL_SQL = text("""
+    INSERT INTO public.order_state (frontend_hash, user_id, stage, last_event_id, updated_at)
+    SELECT DISTINCT ON (frontend_hash)
+      frontend_hash, user_id, event, id, created_at
+    FROM public.events
+    ORDER BY frontend_hash, id DESC
+""")
+
+def init_order_state():
+    # Creates the order_state table and backfills it from events, once: the
+    # table and its backfill commit together, so later starts skip both.
+    # Table.create would also build the indexes inside its transaction, which
+    # CREATE INDEX CONCURRENTLY refuses; ensure_indexes() adds them afterwards.
+    try:
+        with engine.begin() as conn:
+            if inspect(conn).has_table(OrderState.__tablename__, schema='public'):
+                return
+            conn.execute(CreateTable(OrderState.__table__))
+            conn.execute(ORDER_STATE_BACKFILL_SQL)
+    except Exception as e:
+        print(f"Failed to create order state: {e}")
 
-def get_qualified_asks():
-    with Session() as session:
-        e2 = aliased(Event)
+def insert_events_statement():
+    return insert(Event).returning(Event, sort_by_parameter_order=True)
 
-        subquery = exists().where(
-            (e2.frontend_hash == Event.frontend_hash) &
-            ((e2.event == 'SPY_SELL_ORDER_CREATED') |
-             (e2.dspy_average_burning_price.isnot(None)))
-        )
+def insert_events(rows):
+    """
+    Inserts many events with one multi-row INSERT ... RETURNING and a single commit.
 
-        events = session.query(Event).filter(
-            Event.event == "DSPY_RECEIVED",
-            not_(subquery)
-        ).all()
-        events = [e.as_dict for e in events]
-        return (events)
+    Args:
+        rows: list of dicts of Event column values
 
-def get_qualified_mints():
-    with Session() as session:
-        e2 = aliased(Event)
+    Returns:
+        list: the inserted events as dicts, in the order of rows, or None on failure
+    """
+    if not rows:
+        return []
 
-        subquery = exists().where(
-            (e2.frontend_hash == Event.frontend_hash) &
-            (e2.event == 'DSPY_TOKEN_MINTING_INITIATED')
-        )
+    try:
+        with session_scope() as session:
+            new_events = session.scalars(insert_events_statement(), rows).all()
+            upsert_order_state(session, new_events)
+            notify_events(session, [e.event for e in new_events], [e.user_id for e in new_events])
+            new_events = [e.as_dict for e in new_events]
+    except Exception as e:
+        print(f"Failed to insert events: {e}")
+        return None
 
-        events = session.query(Event).filter(
-            Event.event == "SPY_ETF_PURCHASED",
-            not_(subquery)
-        ).all()
-        events = [e.as_dict for e in events]
-        return (events)
+    for user_id in {e['user_id'] for e in new_events}:
+        invalidate_order_history(user_id)
+    return new_events
 
-def get_qualified_burns():
-    with Session() as session:
-        e2 = aliased(Event)
+def insert_event(**kwargs):
+    new_events = insert_events([kwargs])
+    if new_events is None:
+        return None
+    return new_events[0]
 
-        subquery = exists().where(
-            (e2.frontend_hash == Event.frontend_hash) &
-            (e2.event == 'DSPY_TOKEN_BURNING_INITIATED')
-        )
+def orders_at_stage_statement(*stages):
+    return select(Event).join(
+        OrderState, OrderState.last_event_id == Event.id
+    ).where(
+        OrderState.stage.in_(stages)
+    )
 
-        events = session.query(Event).filter(
-            Event.event == "SPY_ETF_SOLD",
-            not_(subquery)
-        ).all()
+def get_orders_at_stage(*stages):
+    with Session() as session:
+        events = session.scalars(orders_at_stage_statement(*stages)).all()
         events = [e.as_dict for e in events]
         return (events)
 
-def get_qualified_redemptions():
-    with Session() as session:
-        e2 = aliased(Event)
+def get_qualified_bids():
+    return get_orders_at_stage("USDC_RECEIVED")
 
-        subquery = exists().where(
-            (e2.frontend_hash == Event.frontend_hash) &
-            (e2.event == 'REDEMPTION_USDC_TRANSFER_INITIATED')
-        )
+def get_qualified_asks():
+    return get_orders_at_stage("DSPY_RECEIVED")
 
-        events = session.query(Event).filter(
-            Event.event == "DSPY_TOKEN_BURNED",
-            not_(subquery)
-        ).all()
-        events = [e.as_dict for e in events]
-        return (events)
+def get_qualified_mints():
+    return get_orders_at_stage("SPY_ETF_PURCHASED")
 
-def find_buy_order(frontend_hash, user_usdc_wallet_address):
+def get_qualified_burns():
+    return get_orders_at_stage("SPY_ETF_SOLD")
+
+def get_qualified_redemptions():
+    return get_orders_at_stage("DSPY_TOKEN_BURNED")
+
+def get_unfilled_orders():
+    return get_orders_at_stage("SPY_BUY_ORDER_CREATED", "SPY_SELL_ORDER_CREATED")
+
+def event_is(event_type):
+    # Inlined rather than bound so the planner can match the partial indexes
+    return Event.event == literal_column(f"'{event_type}'")
+
+def find_buy_order_statement(frontend_hash, user_usdc_wallet_address):
+    return select(Event).where(
+        event_is("BUY_ORDER_CREATED"),
+        Event.frontend_hash == frontend_hash,
+        Event.user_usdc_wallet_address == user_usdc_wallet_address
+    ).limit(1)
+
+def find_bought_order_statement(frontend_hash, user_dspy_wallet_address):
+    return select(Event).where(
+        event_is("SPY_ETF_PURCHASED"),
+        Event.frontend_hash == frontend_hash,
+        Event.user_dspy_wallet_address == user_dspy_wallet_address
+    ).limit(1)
+
+def find_sold_order_statement(frontend_hash):
+    return select(Event).where(
+        event_is("SPY_ETF_SOLD"),
+        Event.frontend_hash == frontend_hash
+    ).limit(1)
+
+def find_sell_order_statement(frontend_hash, user_dspy_wallet_address):
+    return select(Event).where(
+        event_is("SELL_ORDER_CREATED"),
+        Event.frontend_hash == frontend_hash,
+        Event.user_dspy_wallet_address == user_dspy_wallet_address
+    ).limit(1)
+
+def find_event(statement):
     with Session() as session:
-        event = session.query(Event).filter(
-            Event.event == "BUY_ORDER_CREATED",
-            Event.frontend_hash == frontend_hash,
-            Event.user_usdc_wallet_address == user_usdc_wallet_address
-        ).first()
+        event = session.scalars(statement).first()
         event = event.as_dict if event else None
         return (event)
 
+def find_buy_order(frontend_hash, user_usdc_wallet_address):
+    return find_event(find_buy_order_statement(frontend_hash, user_usdc_wallet_address))
+
 def find_bought_order(frontend_hash, user_dspy_wallet_address):
-    with Session() as session:
-        event = session.query(Event).filter(
-            Event.event == "SPY_ETF_PURCHASED",
-            Event.frontend_hash == frontend_hash,
-            Event.user_dspy_wallet_address == user_dspy_wallet_address
-        ).first()
-        event = event.as_dict if event else None
-        return (event)
+    return find_event(find_bought_order_statement(frontend_hash, user_dspy_wallet_address))
 
 def find_sold_order(frontend_hash):
-    with Session() as session:
-        event = session.query(Event).filter(
-            Event.event == "SPY_ETF_SOLD",
-            Event.frontend_hash == frontend_hash
-        ).first()
-        event = event.as_dict if event else None
-        return (event)
-
+    return find_event(find_sold_order_statement(frontend_hash))
 
 def find_sell_order(frontend_hash, user_dspy_wallet_address):
+    return find_event(find_sell_order_statement(frontend_hash, user_dspy_wallet_address))
+
+def find_created_orders_statement(frontend_hashes_by_event):
+    return select(Event, OrderState.stage).join(
+        OrderState, OrderState.frontend_hash == Event.frontend_hash
+    ).where(or_(*[
+        and_(event_is(event_type), Event.frontend_hash.in_(frontend_hashes))
+        for event_type, frontend_hashes in frontend_hashes_by_event.items()
+    ]))
+
+def find_created_orders(frontend_hashes_by_event):
+    """
+    Bulk find_buy_order / find_sell_order for a batch of deposits, in one query.
+
+    Args:
+        frontend_hashes_by_event: {'BUY_ORDER_CREATED': [hash, ...], 'SELL_ORDER_CREATED': [...]}
+
+    Returns:
+        dict: (event type, str(frontend_hash)) -> created event dict, plus the
+        order's current 'stage' so replayed deposits can be skipped
+    """
+    frontend_hashes_by_event = {
+        event_type: [uuid.UUID(str(h)) for h in frontend_hashes]
+        for event_type, frontend_hashes in frontend_hashes_by_event.items() if frontend_hashes
+    }
+    if not frontend_hashes_by_event:
+        return {}
+
     with Session() as session:
-        event = session.query(Event).filter(
-            Event.event == "SELL_ORDER_CREATED",
-            Event.frontend_hash == frontend_hash,
-            Event.user_dspy_wallet_address == user_dspy_wallet_address
-        ).first()
-        event = event.as_dict if event else None
-        return (event)
+        rows = session.execute(find_created_orders_statement(frontend_hashes_by_event)).all()
+        orders = {}
+        for event, stage in rows:
+            order = event.as_dict
+            order['stage'] = stage
+            orders[(event.event, str(event.frontend_hash))] = order
+        return orders
+
+def user_wallet_statement(user_id):
+    return select(RegisteredWallet).where(RegisteredWallet.user_id == user_id).limit(1)
+
+# user_id -> (expires_at, wallet dict), least recently used first
+wallet_cache_lock = threading.Lock()
+wallet_cache = OrderedDict()
+wallet_cache_version = {'value': 0}
+
+def cached_wallet(user_id):
+    # Returns (wallet or None, version to pass back to cache_wallet)
+    with wallet_cache_lock:
+        entry = wallet_cache.get(user_id)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                wallet_cache.move_to_end(user_id)
+                return entry[1], None
+            del wallet_cache[user_id]
+        return None, wallet_cache_version['value']
+
+def cache_wallet(user_id, wallet, version=None):
+    # version guards a read-through against an invalidation that raced it;
+    # write-throughs pass None and always land
+    if wallet is None:
+        return
+    with wallet_cache_lock:
+        if version is not None and version != wallet_cache_version['value']:
+            return
+        wallet_cache[user_id] = (time.monotonic() + WALLET_CACHE_TTL_SECONDS, wallet)
+        wallet_cache.move_to_end(user_id)
+        while len(wallet_cache) > WALLET_CACHE_SIZE:
+            wallet_cache.popitem(last=False)
+
+def invalidate_wallet(user_id):
+    with wallet_cache_lock:
+        wallet_cache.pop(user_id, None)
+        wallet_cache_version['value'] += 1
+
+def clear_wallet_cache():
+    with wallet_cache_lock:
+        wallet_cache.clear()
+        wallet_cache_version['value'] += 1
 
 def get_user_wallet_address(user_id):
+    start_cache_invalidation_listener()
+
+    wallets, version = cached_wallet(user_id)
+    if wallets is not None:
+        return (wallets)
+
     with Session() as session:
-        wallets = session.query(RegisteredWallet).filter(
-            RegisteredWallet.user_id == user_id
-        ).first()
+        wallets = session.scalars(user_wallet_statement(user_id)).first()
         wallets = wallets.as_dict if wallets else None
-        return (wallets)
+
+    cache_wallet(user_id, wallets, version)
+    return (wallets)
+
+def wallet_upsert_statement(wallets):
+    stmt = pg_insert(RegisteredWallet).values(wallets)
+    # xmax is 0 only on rows this statement inserted rather than updated
+    return stmt.on_conflict_do_update(
+        index_elements=[RegisteredWallet.user_id],
+        set_={
+            'usdc_wallet': stmt.excluded.usdc_wallet,
+            'dspy_wallet': stmt.excluded.dspy_wallet,
+        }
+    ).returning(*RegisteredWallet.__table__.columns, literal_column("xmax = 0").label("inserted"))
+
+def wallet_row(row):
+    return {c.name: row[c.name] for c in RegisteredWallet.__table__.columns}
 
 def update_or_create_user_wallet_address(user_id, usdc_wallet, dspy_wallet):
-    with Session() as session:
-        try:
-            # Check if a wallet entry for the user_id already exists
-            wallet = session.query(RegisteredWallet).filter_by(user_id=user_id).first()
-
-            if wallet:
-                # Update existing wallet
-                wallet.usdc_wallet = usdc_wallet
-                wallet.dspy_wallet = dspy_wallet
-                print(f"Updated wallet for user_id: {user_id}")
-            else:
-                # Create a new wallet entry
-                new_wallet = RegisteredWallet(
-                    user_id=user_id,
-                    usdc_wallet=usdc_wallet,
-                    dspy_wallet=dspy_wallet
-                )
-                session.add(new_wallet)
-                wallet = new_wallet
-                print(f"Created new wallet for user_id: {user_id}")
-
-            session.commit()
-            session.refresh(wallet)
-            return wallet.as_dict
-        except Exception as e:
-            session.rollback()
-            print(f"Failed to update or create wallet for user_id {user_id}: {e}")
-            return None
+    # Upsert and notification in one statement, so concurrent registrations
+    # for the same user cannot race into the unique constraint
+    upserted = wallet_upsert_statement([{
+        'user_id': user_id,
+        'usdc_wallet': usdc_wallet,
+        'dspy_wallet': dspy_wallet,
+    }]).cte("upserted")
+    stmt = select(
+        upserted,
+        func.pg_notify(WALLET_UPDATES_CHANNEL, f"{user_id}|{PROCESS_ID}").label("notified")
+    )
 
-def get_all_orders(user_id):
-    sql = """
+    try:
+        with session_scope() as session:
+            row = session.execute(stmt).mappings().one()
+    except Exception as e:
+        print(f"Failed to update or create wallet for user_id {user_id}: {e}")
+        return None
+
+    if row['inserted']:
+        print(f"Created new wallet for user_id: {user_id}")
+    else:
+        print(f"Updated wallet for user_id: {user_id}")
+
+    wallet = wallet_row(row)
+    cache_wallet(user_id, wallet)
+    return wallet
+
+def upsert_user_wallet_addresses(wallets):
+    """
+    Bulk update_or_create_user_wallet_address for migrations and backfills.
+
+    Args:
+        wallets: list of dicts with user_id, usdc_wallet and dspy_wallet
+
+    Returns:
+        list: the stored wallets as dicts, or None on failure
+    """
+    # ON CONFLICT can touch a row only once per statement, last entry wins
+    latest = {}
+    for wallet in wallets:
+        latest[wallet['user_id']] = {
+            'user_id': wallet['user_id'],
+            'usdc_wallet': wallet['usdc_wallet'],
+            'dspy_wallet': wallet['dspy_wallet'],
+        }
+    if not latest:
+        return []
+
+    try:
+        with session_scope() as session:
+            rows = session.execute(wallet_upsert_statement(list(latest.values()))).mappings().all()
+            session.execute(
+                text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+                {'channel': WALLET_UPDATES_CHANNEL, 'payloads': [f"{user_id}|{PROCESS_ID}" for user_id in latest]}
+            )
+    except Exception as e:
+        print(f"Failed to upsert {len(latest)} wallets: {e}")
+        return None
+
+    stored = [wallet_row(row) for row in rows]
+    for wallet in stored:
+        cache_wallet(wallet['user_id'], wallet)
+    print(f"Upserted {len(stored)} wallets ({sum(1 for row in rows if row['inserted'])} new)")
+    return stored
+
+ALL_ORDERS_SQL = """
     SELECT DISTINCT ON (frontend_hash)
       frontend_hash,
       event,
@@ -285,7 +624,247 @@ def get_all_orders(user_id):
     WHERE user_id = :user_id
     ORDER BY frontend_hash, created_at DESC
     """
+
+def all_orders_statement():
+    return text(ALL_ORDERS_SQL)
+
+def get_all_orders(user_id):
     with Session() as session:
-        result = session.execute(text(sql), {'user_id': user_id})
+        result = session.execute(all_orders_statement(), {'user_id': user_id})
         rows = result.mappings().all()
         return [dict(row) for row in rows]
+
+# user_id -> {(cursor, status, limit): page}, least recently used first
+order_history_lock = threading.Lock()
+order_history_cache = OrderedDict()
+# Bumped on every invalidation so a page read before it is never cached after it
+order_history_version = {'value': 0}
+cache_listener = {'thread': None}
+
+def invalidate_order_history(user_id):
+    with order_history_lock:
+        order_history_cache.pop(user_id, None)
+        order_history_version['value'] += 1
+
+def clear_order_history_cache():
+    with order_history_lock:
+        order_history_cache.clear()
+        order_history_version['value'] += 1
+
+def encode_order_cursor(updated_at, frontend_hash):
+    raw = f"{updated_at.isoformat()}|{frontend_hash}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_order_cursor(cursor):
+    # Cursors come back from clients, so anything malformed is one ValueError
+    try:
+        updated_at, frontend_hash = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(updated_at), uuid.UUID(frontend_hash)
+    except (ValueError, TypeError, AttributeError) as e:
+        raise ValueError(f"Invalid order cursor: {cursor!r}") from e
+
+def order_history_statement(user_id, limit, cursor=None, status=None):
+    statement = select(
+        Event.frontend_hash,
+        Event.event,
+        Event.created_at,
+        Event.usdc_received_from_user,
+        Event.dspy_average_minting_price,
+        Event.user_spy_buy_order_fee,
+        Event.user_spy_net_buy_order_value,
+        Event.dspy_mint_filled_quantity,
+        Event.dspy_received_from_user,
+        Event.dspy_average_burning_price,
+        Event.user_spy_sell_order_value_usd,
+        Event.user_spy_sell_order_fee_usd,
+        Event.user_spy_sell_net_order_value_usd,
+        OrderState.updated_at,
+    ).join(
+        OrderState, OrderState.last_event_id == Event.id
+    ).where(
+        OrderState.user_id == user_id
+    )
+
+    if status:
+        statement = statement.where(OrderState.stage.in_(status))
+    if cursor:
+        updated_at, frontend_hash = decode_order_cursor(cursor)
+        statement = statement.where(
+            tuple_(OrderState.updated_at, OrderState.frontend_hash) < tuple_(updated_at, frontend_hash)
+        )
+
+    # One extra row tells us whether there is a next page
+    return statement.order_by(
+        OrderState.updated_at.desc(), OrderState.frontend_hash.desc()
+    ).limit(limit + 1)
+
+def build_order_page(rows, limit):
+    orders = [dict(row) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = orders[-1]
+        next_cursor = encode_order_cursor(last['updated_at'], last['frontend_hash'])
+    for order in orders:
+        del order['updated_at']
+    return {'orders': orders, 'next_cursor': next_cursor}
+
+def get_orders_page(user_id, cursor=None, status=None, limit=ORDER_HISTORY_PAGE_SIZE):
+    """
+    One page of a user's orders (latest event per order), newest first.
+
+    Args:
+        cursor (str): next_cursor of the previous page, None for the first page
+        status (str or list): only orders currently at these stages
+
+    Returns:
+        dict: {'orders': [...], 'next_cursor': str or None}
+
+    Raises:
+        ValueError: the cursor is malformed (a client error, e.g. HTTP 400)
+    """
+    start_cache_invalidation_listener()
+
+    if isinstance(status, str):
+        status = [status]
+    status = tuple(sorted(status)) if status else None
+    key = (cursor, status, limit)
+
+    with order_history_lock:
+        pages = order_history_cache.get(user_id)
+        if pages is not None and key in pages:
+            order_history_cache.move_to_end(user_id)
+            return pages[key]
+        version = order_history_version['value']
+
+    with Session() as session:
+        rows = session.execute(order_history_statement(user_id, limit, cursor, status)).mappings().all()
+        page = build_order_page(rows, limit)
+
+    with order_history_lock:
+        if version != order_history_version['value']:
+            return page
+        order_history_cache.setdefault(user_id, {})[key] = page
+        order_history_cache.move_to_end(user_id)
+        while len(order_history_cache) > ORDER_HISTORY_CACHE_USERS:
+            order_history_cache.popitem(last=False)
+    return page
+
+def handle_cache_notification(channel, payload):
+    if channel == ORDER_UPDATES_CHANNEL:
+        invalidate_order_history(payload)
+    elif channel == WALLET_UPDATES_CHANNEL:
+        user_id, _, origin = payload.rpartition("|")
+        # Our own updates were already written through
+        if origin != PROCESS_ID:
+            invalidate_wallet(user_id)
+
+def clear_caches():
+    clear_order_history_cache()
+    clear_wallet_cache()
+
+def run_cache_invalidation_listener():
+    # Drops cached pages / wallets when any process writes for that user
+    while True:
+        conn = None
+        try:
+            conn = open_event_listener(ORDER_UPDATES_CHANNEL, WALLET_UPDATES_CHANNEL)
+            # Notifications sent while we were disconnected are lost
+            clear_caches()
+            while True:
+                if io_select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                for channel, payload in read_notifications(conn):
+                    handle_cache_notification(channel, payload)
+        except Exception as e:
+            print(f"Cache invalidation listener failed: {e}")
+        finally:
+            if conn is not None:
+                conn.close()
+        clear_caches()
+        time.sleep(5)
+
+def start_cache_invalidation_listener():
+    with order_history_lock:
+        if cache_listener['thread'] is not None and cache_listener['thread'].is_alive():
+            return
+        cache_listener['thread'] = threading.Thread(
+            target=run_cache_invalidation_listener, name="cache-invalidation-listener", daemon=True
+        )
+        cache_listener['thread'].start()
+
+def ensure_indexes():
+    # Creates any declared index that is missing, without locking writes
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in (Event.__table__, OrderState.__table__):
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+def prepare_database():
+    """
+    Startup step for the pipeline, run before the first event is written.
+
+    Every insert_events upserts into order_state, so the table and the
+    declared indexes must exist first. The table is backfilled from events
+    only when it is created; both steps are no-ops on later starts.
+    """
+    init_order_state()
+    ensure_indexes()
+
+def plan_index_scans(plan):
+    # (index names used, whether any sequential scan touches events/order_state)
+    indexes, seq_scan = [], False
+    if 'Index Name' in plan:
+        indexes.append(plan['Index Name'])
+    if plan.get('Node Type') == 'Seq Scan' and plan.get('Relation Name') in ('events', 'order_state'):
+        seq_scan = True
+    for child in plan.get('Plans', []):
+        child_indexes, child_seq_scan = plan_index_scans(child)
+        indexes += child_indexes
+        seq_scan = seq_scan or child_seq_scan
+    return indexes, seq_scan
+
+def compile_explain(statement):
+    # exec_driver_sql gets the SQL as is, so expanding IN (...) parameters
+    # have to be rendered now instead of at execution time
+    compiled = statement.compile(dialect=engine.dialect, compile_kwargs={'render_postcompile': True})
+    return f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+
+def explain_statements():
+    # query name -> (EXPLAIN sql, params) for every hot ORM query
+    sample_hash = uuid.uuid4()
+    return {
+        'find_buy_order': compile_explain(find_buy_order_statement(sample_hash, '0x0')),
+        'find_sell_order': compile_explain(find_sell_order_statement(sample_hash, '0x0')),
+        'find_bought_order': compile_explain(find_bought_order_statement(sample_hash, '0x0')),
+        'find_sold_order': compile_explain(find_sold_order_statement(sample_hash)),
+        'get_orders_at_stage': compile_explain(orders_at_stage_statement("USDC_RECEIVED")),
+    }
+
+def explain_index_usage(allow_seqscan=False):
+    """
+    Runs EXPLAIN on every hot query and reports which indexes serve it.
+
+    With allow_seqscan=False sequential scans are disabled for the check, so
+    the answer does not depend on the planner preferring a seq scan on a small
+    table: a query that still seq scans has no usable index.
+
+    Returns:
+        dict: query name -> {'indexes': [...], 'uses_index': bool}
+    """
+    report = {}
+    with engine.connect() as conn:
+        with conn.begin():
+            if not allow_seqscan:
+                conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+
+            for name, (sql, params) in explain_statements().items():
+                report[name] = conn.exec_driver_sql(sql, params).scalar()
+
+            result = conn.execute(text(f"EXPLAIN (FORMAT JSON) {ALL_ORDERS_SQL}"), {'user_id': 'explain'})
+            report['get_all_orders'] = result.scalar()
+
+    for name, plan in report.items():
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        indexes, seq_scan = plan_index_scans(plan[0]['Plan'])
+        report[name] = {'indexes': indexes, 'uses_index': bool(indexes) and not seq_scan}
+    return report
@@ -1,5 +1,7 @@
-from event_funcs_utils import db_event_template, user_wallet_details, prefill_usdc_received_event, prefill_dspy_received_event, calculate_sell_order_values
-from db_funcs import insert_event
+from event_funcs_utils import db_event_template, user_wallet_details, calculate_sell_order_values
+from event_funcs_utils import fill_usdc_received_event, fill_dspy_received_event, dir_copy
+from db_funcs import insert_event, insert_events, find_created_orders
+import async_db_funcs
 from order_execution_funcs import order_details
 
 #BUY SIDE EVENTS
@@ -29,28 +31,40 @@ def new_buy_order_event(user_id, usdc_market_order_amount, frontend_hash):
         print(f"Error occurred: {e}")
         return(None)
 
-def usdc_received_event(user_usdc_wallet_address, usdc_amount, frontend_hash):
-    result = prefill_usdc_received_event(usdc_amount, frontend_hash, user_usdc_wallet_address)
-
-    if (result is None):
-        return(None)
+def usdc_received_row(result):
+    return dict(
+        user_id=result['user_id'],
+        event=result['event'],
+        user_usdc_wallet_address=result['user_usdc_wallet_address'],
+        user_dspy_wallet_address=result['user_dspy_wallet_address'],
+        frontend_hash=result['frontend_hash'],
+        order_amount_from_frontend=result['order_amount_from_frontend'],
+        usdc_received_from_user=result['usdc_received_from_user'],
+        user_spy_buy_order_fee=result['user_spy_buy_order_fee'],
+        user_spy_net_buy_order_value=result['user_spy_net_buy_order_value'],
+    )
 
-    try:
-        usdc_received_event = insert_event(
-            user_id=result['user_id'],
-            event=result['event'],
-            user_usdc_wallet_address=result['user_usdc_wallet_address'],
-            user_dspy_wallet_address=result['user_dspy_wallet_address'],
-            frontend_hash=result['frontend_hash'],
-            order_amount_from_frontend=result['order_amount_from_frontend'],
-            usdc_received_from_user=result['usdc_received_from_user'],
-            user_spy_buy_order_fee=result['user_spy_buy_order_fee'],
-            user_spy_net_buy_order_value=result['user_spy_net_buy_order_value'],
-        )
-        return (usdc_received_event)
-    except Exception as e:
-        print(f"Error occurred: {e}")
+def usdc_received_event(user_usdc_wallet_address, usdc_amount, frontend_hash):
+    # Same stage check as the batched path: a replayed deposit must not move
+    # an order that already went past BUY_ORDER_CREATED back to the start
+    new_events = deposits_received_events([(user_usdc_wallet_address, usdc_amount, frontend_hash)], [])
+    if not new_events:
         return(None)
+    return (new_events[0])
+
+def send_buy_order_to_exchange_row(order):
+    return dict(
+        user_id=order['user_id'],
+        event='SPY_BUY_ORDER_CREATED',
+        user_usdc_wallet_address=order['user_usdc_wallet_address'],
+        user_dspy_wallet_address=order['user_dspy_wallet_address'],
+        frontend_hash=order['frontend_hash'],
+        order_amount_from_frontend=order['order_amount_from_frontend'],
+        usdc_received_from_user=order['usdc_received_from_user'],
+        user_spy_buy_order_fee=order['user_spy_buy_order_fee'],
+        user_spy_net_buy_order_value=order['user_spy_net_buy_order_value'],
+        buy_order_alpaca_uuid=order['buy_order_alpaca_uuid']
+    )
 
 def send_buy_order_to_exchange_event(order):
 
@@ -58,103 +72,104 @@ def send_buy_order_to_exchange_event(order):
         return(None)
 
     try:
-        spy_buy_order_event = insert_event(
-            user_id=order['user_id'],
-            event='SPY_BUY_ORDER_CREATED',
-            user_usdc_wallet_address=order['user_usdc_wallet_address'],
-            user_dspy_wallet_address=order['user_dspy_wallet_address'],
-            frontend_hash=order['frontend_hash'],
-            order_amount_from_frontend=order['order_amount_from_frontend'],
-            usdc_received_from_user=order['usdc_received_from_user'],
-            user_spy_buy_order_fee=order['user_spy_buy_order_fee'],
-            user_spy_net_buy_order_value=order['user_spy_net_buy_order_value'],
-            buy_order_alpaca_uuid=order['buy_order_alpaca_uuid']
-        )
+        spy_buy_order_event = insert_event(**send_buy_order_to_exchange_row(order))
         return (spy_buy_order_event )
     except Exception as e:
         print(f"Error occurred: {e}")
         return(None)
 
-def spy_etf_purchase_event(order):
+def spy_etf_purchase_row(order, alpaca_obj):
+    return dict(
+        user_id=order['user_id'],
+        event='SPY_ETF_PURCHASED',
+        user_usdc_wallet_address=order['user_usdc_wallet_address'],
+        user_dspy_wallet_address=order['user_dspy_wallet_address'],
+        frontend_hash=order['frontend_hash'],
+        order_amount_from_frontend=order['order_amount_from_frontend'],
+        usdc_received_from_user=order['usdc_received_from_user'],
+        user_spy_buy_order_fee=order['user_spy_buy_order_fee'],
+        user_spy_net_buy_order_value=order['user_spy_net_buy_order_value'],
+        buy_order_alpaca_uuid=order['buy_order_alpaca_uuid'],
+        dspy_average_minting_price=alpaca_obj.filled_avg_price,
+        dspy_mint_filled_quantity=alpaca_obj.filled_qty,
+    )
+
+def spy_etf_purchase_event(order, alpaca_obj=None):
 
     if (order is None):
         return(None)
 
 
     try:
-        alpaca_obj = order_details(order['buy_order_alpaca_uuid'])
+        # Netted orders pass their allocated share of the fill
+        if alpaca_obj is None:
+            alpaca_obj = order_details(order['buy_order_alpaca_uuid'])
         print(alpaca_obj)
 
         if alpaca_obj is None:
             raise ValueError("Alpaca order not found")
 
-        spy_etf_purchase_event = insert_event(
-            user_id=order['user_id'],
-            event='SPY_ETF_PURCHASED',
-            user_usdc_wallet_address=order['user_usdc_wallet_address'],
-            user_dspy_wallet_address=order['user_dspy_wallet_address'],
-            frontend_hash=order['frontend_hash'],
-            order_amount_from_frontend=order['order_amount_from_frontend'],
-            usdc_received_from_user=order['usdc_received_from_user'],
-            user_spy_buy_order_fee=order['user_spy_buy_order_fee'],
-            user_spy_net_buy_order_value=order['user_spy_net_buy_order_value'],
-            buy_order_alpaca_uuid=order['buy_order_alpaca_uuid'],
-            dspy_average_minting_price=alpaca_obj.filled_avg_price,
-            dspy_mint_filled_quantity=alpaca_obj.filled_qty,
-        )
+        spy_etf_purchase_event = insert_event(**spy_etf_purchase_row(order, alpaca_obj))
         return (spy_etf_purchase_event)
     except Exception as e:
         print(f"Error occurred: {e}")
         return(None)
 
+def dspy_token_minting_init_row(order):
+    return dict(
+        user_id=order['user_id'],
+        event='DSPY_TOKEN_MINTING_INITIATED',
+        user_usdc_wallet_address=order['user_usdc_wallet_address'],
+        user_dspy_wallet_address=order['user_dspy_wallet_address'],
+        frontend_hash=order['frontend_hash'],
+        order_amount_from_frontend=order['order_amount_from_frontend'],
+        usdc_received_from_user=order['usdc_received_from_user'],
+        user_spy_buy_order_fee=order['user_spy_buy_order_fee'],
+        user_spy_net_buy_order_value=order['user_spy_net_buy_order_value'],
+        buy_order_alpaca_uuid=order['buy_order_alpaca_uuid'],
+        dspy_average_minting_price=order['dspy_average_minting_price'],
+        dspy_mint_filled_quantity=order['dspy_mint_filled_quantity'],
+        gas_paid_for_sending_dspy_to_user=order['gas_paid_for_sending_dspy_to_user'],
+        smart_contract_two_transaction_hash=order['smart_contract_two_transaction_hash'],
+    )
+
 def dspy_token_minting_init_event(order):
 
     if (order is None):
         return(None)
 
     try:
-        dspy_token_minting_init_event = insert_event(
-            user_id=order['user_id'],
-            event='DSPY_TOKEN_MINTING_INITIATED',
-            user_usdc_wallet_address=order['user_usdc_wallet_address'],
-            user_dspy_wallet_address=order['user_dspy_wallet_address'],
-            frontend_hash=order['frontend_hash'],
-            order_amount_from_frontend=order['order_amount_from_frontend'],
-            usdc_received_from_user=order['usdc_received_from_user'],
-            user_spy_buy_order_fee=order['user_spy_buy_order_fee'],
-            user_spy_net_buy_order_value=order['user_spy_net_buy_order_value'],
-            buy_order_alpaca_uuid=order['buy_order_alpaca_uuid'],
-            dspy_average_minting_price=order['dspy_average_minting_price'],
-            dspy_mint_filled_quantity=order['dspy_mint_filled_quantity'],
-            gas_paid_for_sending_dspy_to_user=order['gas_paid_for_sending_dspy_to_user'],
-        )
+        dspy_token_minting_init_event = insert_event(**dspy_token_minting_init_row(order))
         return (dspy_token_minting_init_event)
     except Exception as e:
         print(f"Error occurred: {e}")
         return(None)
 
+def dspy_order_filled_token_minted_row(order):
+    return dict(
+        user_id=order['user_id'],
+        event='BUY_ORDER_FILLED_TOKEN_MINTED',
+        user_usdc_wallet_address=order['user_usdc_wallet_address'],
+        user_dspy_wallet_address=order['user_dspy_wallet_address'],
+        frontend_hash=order['frontend_hash'],
+        order_amount_from_frontend=order['order_amount_from_frontend'],
+        usdc_received_from_user=order['usdc_received_from_user'],
+        user_spy_buy_order_fee=order['user_spy_buy_order_fee'],
+        user_spy_net_buy_order_value=order['user_spy_net_buy_order_value'],
+        buy_order_alpaca_uuid=order['buy_order_alpaca_uuid'],
+        dspy_average_minting_price=order['dspy_average_minting_price'],
+        dspy_mint_filled_quantity=order['dspy_mint_filled_quantity'],
+        gas_paid_for_sending_dspy_to_user=order['gas_paid_for_sending_dspy_to_user'],
+        smart_contract_two_transaction_hash=order['smart_contract_two_transaction_hash'],
+    )
+
 def dspy_order_filled_token_minted_event(order):
 
     if (order is None):
         return(None)
 
     try:
-        dspy_order_filled_token_minted_event = insert_event(
-            user_id=order['user_id'],
-            event='BUY_ORDER_FILLED_TOKEN_MINTED',
-            user_usdc_wallet_address=order['user_usdc_wallet_address'],
-            user_dspy_wallet_address=order['user_dspy_wallet_address'],
-            frontend_hash=order['frontend_hash'],
-            order_amount_from_frontend=order['order_amount_from_frontend'],
-            usdc_received_from_user=order['usdc_received_from_user'],
-            user_spy_buy_order_fee=order['user_spy_buy_order_fee'],
-            user_spy_net_buy_order_value=order['user_spy_net_buy_order_value'],
-            buy_order_alpaca_uuid=order['buy_order_alpaca_uuid'],
-            dspy_average_minting_price=order['dspy_average_minting_price'],
-            dspy_mint_filled_quantity=order['dspy_mint_filled_quantity'],
-            gas_paid_for_sending_dspy_to_user=order['gas_paid_for_sending_dspy_to_user'],
-            smart_contract_two_transaction_hash=order['smart_contract_two_transaction_hash'],
-        )
+        dspy_order_filled_token_minted_event = insert_event(**dspy_order_filled_token_minted_row(order))
         return (dspy_order_filled_token_minted_event)
     except Exception as e:
         print(f"Error occurred: {e}")
@@ -188,27 +203,35 @@ def new_sell_order_event(user_id, dspy_market_order_amount, frontend_hash):
         print(f"Error occurred: {e}")
         return(None)
 
-def dspy_received_event(user_dspy_wallet_address, dspy_amount, frontend_hash):
-    result = prefill_dspy_received_event(dspy_amount, frontend_hash, user_dspy_wallet_address)
-
-    if (result is None):
-        print("Prefill failed, Error occurred")
-        return(None)
+def dspy_received_row(result):
+    return dict(
+        user_id=result['user_id'],
+        event=result['event'],
+        user_usdc_wallet_address=result['user_usdc_wallet_address'],
+        user_dspy_wallet_address=result['user_dspy_wallet_address'],
+        frontend_hash=result['frontend_hash'],
+        order_amount_from_frontend=result['order_amount_from_frontend'],
+        dspy_received_from_user=result['dspy_received_from_user'],
+    )
 
-    try:
-        dspy_received_event = insert_event(
-            user_id=result['user_id'],
-            event=result['event'],
-            user_usdc_wallet_address=result['user_usdc_wallet_address'],
-            user_dspy_wallet_address=result['user_dspy_wallet_address'],
-            frontend_hash=result['frontend_hash'],
-            order_amount_from_frontend=result['order_amount_from_frontend'],
-            dspy_received_from_user=result['dspy_received_from_user'],
-        )
-        return (dspy_received_event)
-    except Exception as e:
-        print(f"Error occurred: {e}")
+def dspy_received_event(user_dspy_wallet_address, dspy_amount, frontend_hash):
+    # Only recorded while the order is still at SELL_ORDER_CREATED
+    new_events = deposits_received_events([], [(user_dspy_wallet_address, dspy_amount, frontend_hash)])
+    if not new_events:
         return(None)
+    return (new_events[0])
+
+def send_sell_order_to_exchange_row(order):
+    return dict(
+        user_id=order['user_id'],
+        event='SPY_SELL_ORDER_CREATED',
+        user_usdc_wallet_address=order['user_usdc_wallet_address'],
+        user_dspy_wallet_address=order['user_dspy_wallet_address'],
+        frontend_hash=order['frontend_hash'],
+        order_amount_from_frontend=order['order_amount_from_frontend'],
+        dspy_received_from_user=order['dspy_received_from_user'],
+        sell_order_alpaca_uuid=order['sell_order_alpaca_uuid']
+    )
 
 def send_sell_order_to_exchange_event(order):
 
@@ -216,81 +239,100 @@ def send_sell_order_to_exchange_event(order):
         return(None)
 
     try:
-        spy_sell_order_event = insert_event(
-            user_id=order['user_id'],
-            event='SPY_SELL_ORDER_CREATED',
-            user_usdc_wallet_address=order['user_usdc_wallet_address'],
-            user_dspy_wallet_address=order['user_dspy_wallet_address'],
-            frontend_hash=order['frontend_hash'],
-            order_amount_from_frontend=order['order_amount_from_frontend'],
-            dspy_received_from_user=order['dspy_received_from_user'],
-            sell_order_alpaca_uuid=order['sell_order_alpaca_uuid']
-        )
+        spy_sell_order_event = insert_event(**send_sell_order_to_exchange_row(order))
         return (spy_sell_order_event)
     except Exception as e:
         print(f"Error occurred: {e}")
         return(None)
 
 
-def spy_etf_sell_event(order):
+def spy_etf_sell_row(order, alpaca_obj):
+    cal_sell_order_value = calculate_sell_order_values(alpaca_obj)
+
+    return dict(
+        user_id=order['user_id'],
+        event='SPY_ETF_SOLD',
+        user_usdc_wallet_address=order['user_usdc_wallet_address'],
+        user_dspy_wallet_address=order['user_dspy_wallet_address'],
+        frontend_hash=order['frontend_hash'],
+        order_amount_from_frontend=order['order_amount_from_frontend'],
+        dspy_received_from_user=order['dspy_received_from_user'],
+        dspy_average_burning_price=alpaca_obj.filled_avg_price,
+        dspy_burning_filled_quantity=alpaca_obj.filled_qty,
+        user_spy_sell_order_value_usd=cal_sell_order_value['total_sell_order_value'],
+        user_spy_sell_net_order_value_usd=cal_sell_order_value['total_net_sell_order_value'],
+        user_spy_sell_order_fee_usd=cal_sell_order_value['total_sell_order_fee']
+    )
+
+def spy_etf_sell_event(order, alpaca_obj=None):
 
     if (order is None):
         return(None)
 
     try:
-        alpaca_obj = order_details(order['sell_order_alpaca_uuid'])
-
-        cal_sell_order_value = calculate_sell_order_values(alpaca_obj)
+        # Netted orders pass their allocated share of the fill
+        if alpaca_obj is None:
+            alpaca_obj = order_details(order['sell_order_alpaca_uuid'])
 
         if alpaca_obj is None:
             raise ValueError("Alpaca order not found")
 
-        spy_etf_sell_event = insert_event(
-            user_id=order['user_id'],
-            event='SPY_ETF_SOLD',
-            user_usdc_wallet_address=order['user_usdc_wallet_address'],
-            user_dspy_wallet_address=order['user_dspy_wallet_address'],
-            frontend_hash=order['frontend_hash'],
-            order_amount_from_frontend=order['order_amount_from_frontend'],
-            dspy_received_from_user=order['dspy_received_from_user'],
-            dspy_average_burning_price=alpaca_obj.filled_avg_price,
-            dspy_burning_filled_quantity=alpaca_obj.filled_qty,
-            user_spy_sell_order_value_usd=cal_sell_order_value['total_sell_order_value'],
-            user_spy_sell_net_order_value_usd=cal_sell_order_value['total_net_sell_order_value'],
-            user_spy_sell_order_fee_usd=cal_sell_order_value['total_sell_order_fee']
-        )
+        spy_etf_sell_event = insert_event(**spy_etf_sell_row(order, alpaca_obj))
         return (spy_etf_sell_event)
     except Exception as e:
         print(f"Error occurred: {e}")
         return(None)
 
+def dspy_token_burning_init_row(order):
+    return dict(
+        user_id=order['user_id'],
+        event='DSPY_TOKEN_BURNING_INITIATED',
+        user_usdc_wallet_address=order['user_usdc_wallet_address'],
+        user_dspy_wallet_address=order['user_dspy_wallet_address'],
+        frontend_hash=order['frontend_hash'],
+        order_amount_from_frontend=order['order_amount_from_frontend'],
+        dspy_received_from_user=order['dspy_received_from_user'],
+        dspy_average_burning_price=order['dspy_average_burning_price'],
+        dspy_burning_filled_quantity=order['dspy_burning_filled_quantity'],
+        user_spy_sell_order_value_usd=order['user_spy_sell_order_value_usd'],
+        user_spy_sell_net_order_value_usd=order['user_spy_sell_net_order_value_usd'],
+        user_spy_sell_order_fee_usd=order['user_spy_sell_order_fee_usd'],
+        gas_paid_for_sending_dspy_to_smart_contract=order['gas_paid_for_sending_dspy_to_smart_contract'], #The gas we paid for initiating the burn function
+        smart_contract_two_transaction_hash=order['smart_contract_two_transaction_hash'],
+
+    )
+
 def dspy_token_burning_init_event(order):
 
     if (order is None):
         return(None)
 
     try:
-        dspy_token_burning_init_event = insert_event(
-            user_id=order['user_id'],
-            event='DSPY_TOKEN_BURNING_INITIATED',
-            user_usdc_wallet_address=order['user_usdc_wallet_address'],
-            user_dspy_wallet_address=order['user_dspy_wallet_address'],
-            frontend_hash=order['frontend_hash'],
-            order_amount_from_frontend=order['order_amount_from_frontend'],
-            dspy_received_from_user=order['dspy_received_from_user'],
-            dspy_average_burning_price=order['dspy_average_burning_price'],
-            dspy_burning_filled_quantity=order['dspy_burning_filled_quantity'],
-            user_spy_sell_order_value_usd=order['user_spy_sell_order_value_usd'],
-            user_spy_sell_net_order_value_usd=order['user_spy_sell_net_order_value_usd'],
-            user_spy_sell_order_fee_usd=order['user_spy_sell_order_fee_usd'],
-            gas_paid_for_sending_dspy_to_smart_contract=order['gas_paid_for_sending_dspy_to_smart_contract'], #The gas we paid for initiating the burn function
-
-        )
+        dspy_token_burning_init_event = insert_event(**dspy_token_burning_init_row(order))
         return (dspy_token_burning_init_event)
     except Exception as e:
         print(f"Error occurred: {e}")
         return(None)
 
+def dspy_token_burned_row(order):
+    return dict(
+        user_id=order['user_id'],
+        event='DSPY_TOKEN_BURNED',
+        user_usdc_wallet_address=order['user_usdc_wallet_address'],
+        user_dspy_wallet_address=order['user_dspy_wallet_address'],
+        frontend_hash=order['frontend_hash'],
+        order_amount_from_frontend=order['order_amount_from_frontend'],
+        dspy_received_from_user=order['dspy_received_from_user'],
+        dspy_average_burning_price=order['dspy_average_burning_price'],
+        dspy_burning_filled_quantity=order['dspy_burning_filled_quantity'],
+        user_spy_sell_order_value_usd=order['user_spy_sell_order_value_usd'],
+        user_spy_sell_net_order_value_usd=order['user_spy_sell_net_order_value_usd'],
+        user_spy_sell_order_fee_usd=order['user_spy_sell_order_fee_usd'],
+        gas_paid_for_sending_dspy_to_smart_contract=order['gas_paid_for_sending_dspy_to_smart_contract'], #The gas we paid for initiating the burn function
+        smart_contract_two_transaction_hash=order['smart_contract_two_transaction_hash'],
+
+    )
+
 def dspy_token_burned_event(order):
 
     if (order is None):
@@ -298,83 +340,182 @@ def dspy_token_burned_event(order):
         return(None)
 
     try:
-        dspy_token_burning_init_event = insert_event(
-            user_id=order['user_id'],
-            event='DSPY_TOKEN_BURNED',
-            user_usdc_wallet_address=order['user_usdc_wallet_address'],
-            user_dspy_wallet_address=order['user_dspy_wallet_address'],
-            frontend_hash=order['frontend_hash'],
-            order_amount_from_frontend=order['order_amount_from_frontend'],
-            dspy_received_from_user=order['dspy_received_from_user'],
-            dspy_average_burning_price=order['dspy_average_burning_price'],
-            dspy_burning_filled_quantity=order['dspy_burning_filled_quantity'],
-            user_spy_sell_order_value_usd=order['user_spy_sell_order_value_usd'],
-            user_spy_sell_net_order_value_usd=order['user_spy_sell_net_order_value_usd'],
-            user_spy_sell_order_fee_usd=order['user_spy_sell_order_fee_usd'],
-            gas_paid_for_sending_dspy_to_smart_contract=order['gas_paid_for_sending_dspy_to_smart_contract'], #The gas we paid for initiating the burn function
-            smart_contract_two_transaction_hash=order['smart_contract_two_transaction_hash'],
-
-        )
+        dspy_token_burning_init_event = insert_event(**dspy_token_burned_row(order))
         return (dspy_token_burning_init_event)
     except Exception as e:
         print(f"Error occurred: {e}")
         return(None)
 
+def usdc_redemption_transfer_initiated_row(order):
+    return dict(
+        user_id=order['user_id'],
+        event='REDEMPTION_USDC_TRANSFER_INITIATED',
+        user_usdc_wallet_address=order['user_usdc_wallet_address'],
+        user_dspy_wallet_address=order['user_dspy_wallet_address'],
+        frontend_hash=order['frontend_hash'],
+        order_amount_from_frontend=order['order_amount_from_frontend'],
+        dspy_received_from_user=order['dspy_received_from_user'],
+        dspy_average_burning_price=order['dspy_average_burning_price'],
+        dspy_burning_filled_quantity=order['dspy_burning_filled_quantity'],
+        user_spy_sell_order_value_usd=order['user_spy_sell_order_value_usd'],
+        user_spy_sell_net_order_value_usd=order['user_spy_sell_net_order_value_usd'],
+        user_spy_sell_order_fee_usd=order['user_spy_sell_order_fee_usd'],
+        gas_paid_for_sending_dspy_to_smart_contract=order['gas_paid_for_sending_dspy_to_smart_contract'], #The gas we paid for initiating the burn function
+        smart_contract_two_transaction_hash=order['smart_contract_two_transaction_hash'],
+        gas_paid_for_sending_usdc=order['gas_paid_for_sending_usdc'],
+        smart_contract_one_transaction_hash=order['smart_contract_one_transaction_hash'], #The USDC transfer to the user
+
+    )
+
 def usdc_redemption_transfer_initiated(order):
 
     if (order is None):
         return(None)
 
     try:
-        usdc_redemption_transfer_event = insert_event(
-            user_id=order['user_id'],
-            event='REDEMPTION_USDC_TRANSFER_INITIATED',
-            user_usdc_wallet_address=order['user_usdc_wallet_address'],
-            user_dspy_wallet_address=order['user_dspy_wallet_address'],
-            frontend_hash=order['frontend_hash'],
-            order_amount_from_frontend=order['order_amount_from_frontend'],
-            dspy_received_from_user=order['dspy_received_from_user'],
-            dspy_average_burning_price=order['dspy_average_burning_price'],
-            dspy_burning_filled_quantity=order['dspy_burning_filled_quantity'],
-            user_spy_sell_order_value_usd=order['user_spy_sell_order_value_usd'],
-            user_spy_sell_net_order_value_usd=order['user_spy_sell_net_order_value_usd'],
-            user_spy_sell_order_fee_usd=order['user_spy_sell_order_fee_usd'],
-            gas_paid_for_sending_dspy_to_smart_contract=order['gas_paid_for_sending_dspy_to_smart_contract'], #The gas we paid for initiating the burn function
-            smart_contract_two_transaction_hash=order['smart_contract_two_transaction_hash'],
-            gas_paid_for_sending_usdc=order['gas_paid_for_sending_usdc'],
-
-        )
+        usdc_redemption_transfer_event = insert_event(**usdc_redemption_transfer_initiated_row(order))
         return (usdc_redemption_transfer_event)
     except Exception as e:
         print(f"Error occurred: {e}")
         return(None)
 
+def sell_order_filled_usdc_sent_row(order):
+    return dict(
+        user_id=order['user_id'],
+        event='SELL_ORDER_FILLED_REDEMPTION_USDC_SENT',
+        user_usdc_wallet_address=order['user_usdc_wallet_address'],
+        user_dspy_wallet_address=order['user_dspy_wallet_address'],
+        frontend_hash=order['frontend_hash'],
+        order_amount_from_frontend=order['order_amount_from_frontend'],
+        dspy_received_from_user=order['dspy_received_from_user'],
+        dspy_average_burning_price=order['dspy_average_burning_price'],
+        dspy_burning_filled_quantity=order['dspy_burning_filled_quantity'],
+        user_spy_sell_order_value_usd=order['user_spy_sell_order_value_usd'],
+        user_spy_sell_net_order_value_usd=order['user_spy_sell_net_order_value_usd'],
+        user_spy_sell_order_fee_usd=order['user_spy_sell_order_fee_usd'],
+        gas_paid_for_sending_dspy_to_smart_contract=order['gas_paid_for_sending_dspy_to_smart_contract'], #The gas we paid for initiating the burn function
+        smart_contract_two_transaction_hash=order['smart_contract_two_transaction_hash'],
+        gas_paid_for_sending_usdc=order['gas_paid_for_sending_usdc'],
+        smart_contract_one_transaction_hash=order['smart_contract_one_transaction_hash'], #The USDC transfer to the user
+        redemption_usdc_sent_to_user=order['redemption_usdc_sent_to_user'],
+
+    )
+
 def sell_order_filled_usdc_sent(order):
 
     if (order is None):
         return(None)
 
     try:
-        sell_order_filled_usdc_sent_event = insert_event(
-            user_id=order['user_id'],
-            event='SELL_ORDER_FILLED_REDEMPTION_USDC_SENT',
-            user_usdc_wallet_address=order['user_usdc_wallet_address'],
-            user_dspy_wallet_address=order['user_dspy_wallet_address'],
-            frontend_hash=order['frontend_hash'],
-            order_amount_from_frontend=order['order_amount_from_frontend'],
-            dspy_received_from_user=order['dspy_received_from_user'],
-            dspy_average_burning_price=order['dspy_average_burning_price'],
-            dspy_burning_filled_quantity=order['dspy_burning_filled_quantity'],
-            user_spy_sell_order_value_usd=order['user_spy_sell_order_value_usd'],
-            user_spy_sell_net_order_value_usd=order['user_spy_sell_net_order_value_usd'],
-            user_spy_sell_order_fee_usd=order['user_spy_sell_order_fee_usd'],
-            gas_paid_for_sending_dspy_to_smart_contract=order['gas_paid_for_sending_dspy_to_smart_contract'], #The gas we paid for initiating the burn function
-            smart_contract_two_transaction_hash=order['smart_contract_two_transaction_hash'],
-            gas_paid_for_sending_usdc=order['gas_paid_for_sending_usdc'],
-            redemption_usdc_sent_to_user=order['redemption_usdc_sent_to_user'],
-
-        )
+        sell_order_filled_usdc_sent_event = insert_event(**sell_order_filled_usdc_sent_row(order))
         return (sell_order_filled_usdc_sent_event)
     except Exception as e:
         print(f"Error occurred: {e}")
         return(None)
+
+#RETRY EVENTS
+
+def requeue_row(order, stage):
+    # The order's current values under an earlier stage's event, so that stage
+    # picks it up again (e.g. SPY_ETF_PURCHASED after its mint was lost)
+    row = dir_copy(order, db_event_template.copy())
+    row['event'] = stage
+    return row
+
+#BATCHED EVENTS
+
+def build_event_rows(*event_rows):
+    # event_rows are (row_builder, orders, *fills) tuples, where fills are
+    # optional per-order builder arguments, e.g. allocated Alpaca fills
+    rows = []
+    for row_builder, orders, *fills in event_rows:
+        rows.extend(row_builder(*args) for args in zip(orders, *fills))
+    return rows
+
+def insert_event_batch(*event_rows):
+    """
+    Writes several orders' events with one multi-row INSERT and a single commit.
+
+    Args:
+        event_rows: (row_builder, orders, *fills) tuples; every row of every
+            tuple lands in the same transaction
+
+    Returns:
+        list: the inserted events, or None if the batch could not be written
+    """
+    try:
+        rows = build_event_rows(*event_rows)
+    except Exception as e:
+        print(f"Error occurred: {e}")
+        return(None)
+
+    return insert_events(rows)
+
+async def async_insert_event_batch(*event_rows):
+    # insert_event_batch on the async engine, for the pipeline coroutines
+    try:
+        rows = build_event_rows(*event_rows)
+    except Exception as e:
+        print(f"Error occurred: {e}")
+        return(None)
+
+    return await async_db_funcs.insert_events(rows)
+
+async def async_insert_single_event(row_builder, order, *fills):
+    if (order is None):
+        return(None)
+
+    events = await async_insert_event_batch((row_builder, [order], *[[fill] for fill in fills]))
+    return events[0] if events else None
+
+def deposits_received_events(usdc_deposits, dspy_deposits):
+    """
+    Batched usdc_received_event / dspy_received_event for on-chain deposits.
+
+    The orders are looked up in one query and every deposit of the batch is
+    written in one commit. Deposits whose order already moved past
+    *_ORDER_CREATED were recorded before and are skipped, so a batch can be
+    replayed safely.
+
+    Args:
+        usdc_deposits: [(user_usdc_wallet_address, usdc_amount, frontend_hash)]
+        dspy_deposits: [(user_dspy_wallet_address, dspy_amount, frontend_hash)]
+
+    Returns:
+        list: the inserted events, or None if the batch could not be written
+    """
+    deposits = [
+        ("BUY_ORDER_CREATED", 'user_usdc_wallet_address', fill_usdc_received_event, usdc_received_row, deposit)
+        for deposit in usdc_deposits
+    ] + [
+        ("SELL_ORDER_CREATED", 'user_dspy_wallet_address', fill_dspy_received_event, dspy_received_row, deposit)
+        for deposit in dspy_deposits
+    ]
+    if not deposits:
+        return []
+
+    frontend_hashes_by_event = {}
+    for created_event, _, _, _, (_, _, frontend_hash) in deposits:
+        frontend_hashes_by_event.setdefault(created_event, set()).add(str(frontend_hash))
+
+    try:
+        orders = find_created_orders({k: list(v) for k, v in frontend_hashes_by_event.items()})
+    except Exception as e:
+        print(f"Error in deposits_received_events: {e}")
+        return(None)
+
+    rows = {}
+    for created_event, wallet_key, fill_event, row_builder, (wallet_address, amount, frontend_hash) in deposits:
+        order = orders.get((created_event, str(frontend_hash)))
+        if order is None or str(order[wallet_key]).lower() != str(wallet_address).lower():
+            print(f"No {created_event} order {frontend_hash} for wallet {wallet_address}")
+            continue
+        if order['stage'] != created_event or str(frontend_hash) in rows:
+            print(f"Deposit for order {frontend_hash} already recorded")
+            continue
+        try:
+            rows[str(frontend_hash)] = row_builder(fill_event(order, amount))
+        except Exception as e:
+            print(f"Error occurred: {e}")
+
+    return insert_events(list(rows.values()))
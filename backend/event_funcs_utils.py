@@ -14,7 +14,6 @@ def user_wallet_details(dic):
         return (None)
 
 def prefill_dspy_received_event(dspy_amount, frontend_hash, user_dspy_wallet_address):
-    result = db_event_template
     try:
         temp = find_sell_order(frontend_hash, user_dspy_wallet_address)
     except Exception as e:
@@ -24,14 +23,16 @@ def prefill_dspy_received_event(dspy_amount, frontend_hash, user_dspy_wallet_add
     if temp is None:
         return (None)
 
-    result = dir_copy(temp, result)
+    return fill_dspy_received_event(temp, dspy_amount)
+
+def fill_dspy_received_event(sell_order, dspy_amount):
+    result = dir_copy(sell_order, db_event_template.copy())
     result['event'] = "DSPY_RECEIVED"
     result['dspy_received_from_user'] = dspy_amount
 
     return (result)
 
 def prefill_usdc_received_event(usdc_amount, frontend_hash, user_usdc_wallet_address):
-    result = db_event_template
     try:
         temp = find_buy_order(frontend_hash, user_usdc_wallet_address)
     except Exception as e:
@@ -41,7 +42,10 @@ def prefill_usdc_received_event(usdc_amount, frontend_hash, user_usdc_wallet_add
     if temp is None:
         return (None)
 
-    result = dir_copy(temp, result)
+    return fill_usdc_received_event(temp, usdc_amount)
+
+def fill_usdc_received_event(buy_order, usdc_amount):
+    result = dir_copy(buy_order, db_event_template.copy())
     result['event'] = "USDC_RECEIVED"
     result['usdc_received_from_user'] = usdc_amount
     result['user_spy_buy_order_fee'] = round(result['usdc_received_from_user'] * Decimal('0.005'), 2)
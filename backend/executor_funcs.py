@@ -0,0 +1,78 @@
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+import os
+import asyncio
+import threading
+
+load_dotenv()
+
+# One bounded thread pool per external system, so a slow chain confirmation
+# can only ever tie up chain workers and never exchange or DB workers.
+POOL_SIZES = {
+    'exchange': int(os.getenv("EXCHANGE_EXECUTOR_WORKERS", "4")),
+    'chain': int(os.getenv("CHAIN_EXECUTOR_WORKERS", "8")),
+    'db': int(os.getenv("DB_EXECUTOR_WORKERS", "8")),
+}
+
+pools = {
+    name: ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"{name}-pool")
+    for name, size in POOL_SIZES.items()
+}
+
+pool_lock = threading.Lock()
+pool_counters = {
+    name: {'queued': 0, 'running': 0, 'completed': 0, 'failed': 0}
+    for name in POOL_SIZES
+}
+
+async def run_in_pool(pool_name, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    counters = pool_counters[pool_name]
+    state = {'started': False, 'abandoned': False}
+
+    def call():
+        with pool_lock:
+            if state['abandoned']:
+                return None
+            state['started'] = True
+            counters['queued'] -= 1
+            counters['running'] += 1
+        try:
+            result = func(*args, **kwargs)
+            with pool_lock:
+                counters['completed'] += 1
+            return result
+        except Exception:
+            with pool_lock:
+                counters['failed'] += 1
+            raise
+        finally:
+            with pool_lock:
+                counters['running'] -= 1
+
+    with pool_lock:
+        counters['queued'] += 1
+    try:
+        return await loop.run_in_executor(pools[pool_name], call)
+    finally:
+        # A call cancelled while still queued never reaches the worker
+        with pool_lock:
+            if not state['started']:
+                state['abandoned'] = True
+                counters['queued'] -= 1
+
+async def run_exchange(func, *args, **kwargs):
+    return await run_in_pool('exchange', func, *args, **kwargs)
+
+async def run_chain(func, *args, **kwargs):
+    return await run_in_pool('chain', func, *args, **kwargs)
+
+async def run_db(func, *args, **kwargs):
+    return await run_in_pool('db', func, *args, **kwargs)
+
+def get_pool_stats():
+    with pool_lock:
+        return {
+            name: {'workers': POOL_SIZES[name], **counters}
+            for name, counters in pool_counters.items()
+        }
@@ -1,93 +1,461 @@
-from db_funcs import get_qualified_bids, get_qualified_asks, get_qualified_mints, get_qualified_burns, get_qualified_redemptions
+from db_funcs import open_event_listener, read_notifications, prepare_database
 from order_execution_funcs import spy_market_buy_order, spy_market_sell_order
 from event_funcs_utils import dir_copy, db_event_template
-from event_funcs import send_buy_order_to_exchange_event, spy_etf_purchase_event, spy_etf_sell_event, send_sell_order_to_exchange_event, dspy_token_minting_init_event, dspy_token_burning_init_event, usdc_redemption_transfer_initiated, sell_order_filled_usdc_sent
+from event_funcs import async_insert_event_batch, async_insert_single_event, requeue_row
+from event_funcs import send_buy_order_to_exchange_row, send_sell_order_to_exchange_row, spy_etf_purchase_row, spy_etf_sell_row, dspy_token_minting_init_row, dspy_token_burning_init_row, usdc_redemption_transfer_initiated_row
 from blockchain_utils import bytes32_to_string, string_to_bytes32, wei_to_usdc, usdc_to_wei, dspy_to_wei
+from executor_funcs import run_exchange, run_chain, run_db
+from market_price_funcs import get_latest_spy_ask, is_market_open, seconds_until_market_open
+from netting_funcs import net_order_flow, allocate_netted_fills, allocate_order_fill, fill_side, net_order_reference_prices, net_order_carried_quantities, netting_state
+from order_execution_funcs import get_fills, forget_fills, add_fill_listener, start_fill_service, is_fully_filled
+from decimal import Decimal
+from receipt_tracker_funcs import track_transaction, track_unsent_transaction, run_receipt_tracker
 from dotenv import load_dotenv
 import os
+import time
 import asyncio
 import blockchain_funcs
+import async_db_funcs
 
 load_dotenv()
 
+# Stages are woken by NOTIFY from insert_event; the fallback poll only
+# catches notifications lost while the listener was reconnecting.
+FALLBACK_POLL_SECONDS = float(os.getenv("FALLBACK_POLL_SECONDS", "30"))
+LISTENER_RETRY_SECONDS = float(os.getenv("LISTENER_RETRY_SECONDS", "5"))
+
+# Where the TokenIssuer has batchMint/batchBurn, mints and burns are gathered
+# for a short window and sent as one transaction; otherwise one per order
+if blockchain_funcs.TOKEN_ISSUER_BATCH_ENABLED:
+    MINT_BATCH_SIZE = int(os.getenv("MINT_BATCH_SIZE", "20"))
+    BURN_BATCH_SIZE = int(os.getenv("BURN_BATCH_SIZE", "20"))
+    BATCH_WINDOW_SECONDS = float(os.getenv("BATCH_WINDOW_SECONDS", "1"))
+else:
+    MINT_BATCH_SIZE = BURN_BATCH_SIZE = 1
+    BATCH_WINDOW_SECONDS = 0
+
+# Buys and sells that qualify in the same window go to Alpaca as one net order
+ORDER_NETTING_ENABLED = os.getenv("ORDER_NETTING_ENABLED", "true").lower() == "true"
+NETTING_WINDOW_SECONDS = float(os.getenv("NETTING_WINDOW_SECONDS", "1"))
+
+# Event type that makes an order qualify for each stage
+STAGE_TRIGGERS = {
+    "USDC_RECEIVED": "buy",
+    "DSPY_RECEIVED": "sell",
+    "SPY_ETF_PURCHASED": "mint",
+    "SPY_ETF_SOLD": "burn",
+    "DSPY_TOKEN_BURNED": "redemption",
+    "SPY_BUY_ORDER_CREATED": "fill",
+    "SPY_SELL_ORDER_CREATED": "fill",
+}
+
+stage_wakeups = {stage: asyncio.Event() for stage in STAGE_TRIGGERS.values()}
+netting_lock = asyncio.Lock()
+
+def wake_all_stages():
+    for wakeup in stage_wakeups.values():
+        wakeup.set()
+
+async def wait_for_stage(*stages):
+    # Returns once any of the stages is woken, or after the fallback poll
+    waiters = [asyncio.create_task(stage_wakeups[stage].wait()) for stage in stages]
+    done, pending = await asyncio.wait(waiters, timeout=FALLBACK_POLL_SECONDS, return_when=asyncio.FIRST_COMPLETED)
+    for waiter in pending:
+        waiter.cancel()
+    for stage in stages:
+        stage_wakeups[stage].clear()
+
+# An order stays qualified until its follow-up event is written, so every
+# stage tracks which frontend_hashes it is already working on.
+in_flight = {stage: set() for stage in STAGE_TRIGGERS.values()}
+released_at = {stage: {} for stage in STAGE_TRIGGERS.values()}
+stage_counters = {
+    stage: {'dispatched': 0, 'skipped': 0, 'completed': 0, 'failed': 0}
+    for stage in STAGE_TRIGGERS.values()
+}
+
+def claim_stage_events(stage, events, snapshot_time):
+    claimed = []
+    for event in events:
+        frontend_hash = event['frontend_hash']
+
+        # Skip orders still running, and orders released after the query that
+        # returned them started (their follow-up event may not have been visible)
+        if frontend_hash in in_flight[stage] or released_at[stage].get(frontend_hash, 0) >= snapshot_time:
+            stage_counters[stage]['skipped'] += 1
+            continue
+
+        in_flight[stage].add(frontend_hash)
+        claimed.append(dir_copy(event, db_event_template.copy()))
+    return claimed
+
+def register_stage_task(stage, orders, task):
+    frontend_hashes = [order['frontend_hash'] for order in orders]
+    stage_counters[stage]['dispatched'] += len(frontend_hashes)
+    task.add_done_callback(lambda t: release_stage_task(stage, frontend_hashes, t))
+
+def start_stage_task(stage, orders, coro):
+    task = asyncio.create_task(coro)
+    register_stage_task(stage, orders, task)
+    return task
+
+def dispatch_stage_task(stage, event, handler, snapshot_time):
+    claimed = claim_stage_events(stage, [event], snapshot_time)
+    if not claimed:
+        return None
+    return start_stage_task(stage, claimed, handler(claimed[0]))
+
+def dispatch_stage_batches(stage, events, handler, batch_size, snapshot_time):
+    claimed = claim_stage_events(stage, events, snapshot_time)
+    return [
+        start_stage_task(stage, claimed[i:i + batch_size], handler(claimed[i:i + batch_size]))
+        for i in range(0, len(claimed), batch_size)
+    ]
+
+def release_stage_task(stage, frontend_hashes, task):
+    now = time.monotonic()
+    for frontend_hash in frontend_hashes:
+        in_flight[stage].discard(frontend_hash)
+        released_at[stage][frontend_hash] = now
+
+    if task.cancelled() or task.exception() is not None:
+        stage_counters[stage]['failed'] += len(frontend_hashes)
+    else:
+        stage_counters[stage]['completed'] += len(frontend_hashes)
+
+def start_stage_tick(stage):
+    snapshot_time = time.monotonic()
+    released = released_at[stage]
+    for frontend_hash in [h for h, t in released.items() if t < snapshot_time]:
+        del released[frontend_hash]
+    return snapshot_time
+
+def get_in_flight_stats():
+    return {
+        stage: {'active': len(in_flight[stage]), **counters}
+        for stage, counters in stage_counters.items()
+    }
+
+async def listen_for_events():
+    loop = asyncio.get_running_loop()
+
+    while True:
+        conn = None
+        fileno = None
+        try:
+            conn = await run_db(open_event_listener)
+            fileno = conn.fileno()
+            readable = asyncio.Event()
+            loop.add_reader(fileno, readable.set)
+            # Anything inserted while we were disconnected was not announced
+            wake_all_stages()
+
+            while True:
+                await readable.wait()
+                readable.clear()
+                for channel, payload in read_notifications(conn):
+                    stage = STAGE_TRIGGERS.get(payload)
+                    if stage:
+                        stage_wakeups[stage].set()
+
+        except Exception as e:
+            print(f"An error occurred in the event listener: {e}")
+
+        finally:
+            if fileno is not None:
+                loop.remove_reader(fileno)
+            if conn is not None:
+                conn.close()
+
+        await asyncio.sleep(LISTENER_RETRY_SECONDS)
+
 async def process_single_buy_order(dic):
     if (dic is None or dic['user_spy_net_buy_order_value'] is None or dic['user_spy_net_buy_order_value'] <= 0):
         return (None)
     try:
-        dic['buy_order_alpaca_uuid'] = spy_market_buy_order(dic['user_spy_net_buy_order_value'])
+        dic['buy_order_alpaca_uuid'] = await run_exchange(spy_market_buy_order, dic['user_spy_net_buy_order_value'])
     except Exception as e:
         print(f"Error processing order: {e}")
         return None
 
+    # SPY_ETF_PURCHASED is written by the fill stage once Alpaca reports the fill
     try:
-        result = send_buy_order_to_exchange_event(dic)
-
-    except Exception as e:
-        print(f"Event error (send_buy_order_to_exchange_event): {e}")
-        return None
-
-    try:
-        result = spy_etf_purchase_event(dic)
+        result = await async_insert_single_event(send_buy_order_to_exchange_row, dic)
         return (result)
 
     except Exception as e:
-        print(f"Event error (spy_etf_purchase_event): {e}")
+        print(f"Event error (send_buy_order_to_exchange_event): {e}")
         return None
 
 async def execute_buy_orders():
 
     while True:
+        if await wait_for_market_open():
+            continue
+
         try:
-            usdt_events = get_qualified_bids()
+            snapshot_time = start_stage_tick("buy")
+            usdt_events = await async_db_funcs.get_qualified_bids()
             if usdt_events:
                 for event in usdt_events:
-                    event_copy = dir_copy(event, db_event_template.copy())
-                    asyncio.create_task(process_single_buy_order(event_copy))
+                    dispatch_stage_task("buy", event, process_single_buy_order, snapshot_time)
 
         except Exception as e:
             print(f"An error occurred in the buy orders execution loop: {e}")
 
-        await asyncio.sleep(2.5)
+        await wait_for_stage("buy")
 
 
 async def process_single_sell_order(dic):
     if (dic is None or dic['dspy_received_from_user'] is None or dic['dspy_received_from_user'] <= 0):
         return (None)
     try:
-       dic['sell_order_alpaca_uuid'] = spy_market_sell_order(dic['dspy_received_from_user'])
+       dic['sell_order_alpaca_uuid'] = await run_exchange(spy_market_sell_order, dic['dspy_received_from_user'])
     except Exception as e:
         print(f"Error processing order: {e}")
         return None
 
+    # SPY_ETF_SOLD is written by the fill stage once Alpaca reports the fill
     try:
-        result = send_sell_order_to_exchange_event(dic)
+        result = await async_insert_single_event(send_sell_order_to_exchange_row, dic)
+        return (result)
 
     except Exception as e:
         print(f"Event error (send_sell_order_to_exchange_event): {e}")
         return None
 
+async def execute_sell_orders():
+
+    while True:
+        if await wait_for_market_open():
+            continue
+
+        try:
+            snapshot_time = start_stage_tick("sell")
+            dspy_events = await async_db_funcs.get_qualified_asks()
+            if dspy_events:
+                for event in dspy_events:
+                    dispatch_stage_task("sell", event, process_single_sell_order, snapshot_time)
+
+        except Exception as e:
+            print(f"An error occurred in the sell orders execution loop: {e}")
+
+        await wait_for_stage("sell")
+
+async def wait_for_market_open():
+    # Orders stay queued at their current stage while the market is closed
     try:
-        result = spy_etf_sell_event(dic)
-        return (result)
+        if (await run_exchange(is_market_open))['is_open']:
+            return False
+        delay = await run_exchange(seconds_until_market_open)
+    except Exception as e:
+        print(f"Could not read the market clock: {e}")
+        delay = LISTENER_RETRY_SECONDS
+    await asyncio.sleep(min(max(delay, 1), FALLBACK_POLL_SECONDS))
+    return True
 
+async def record_events(*event_rows):
+    # Every (row_builder, orders, *fills) group of a tick lands in one commit
+    try:
+        return await async_insert_event_batch(*event_rows)
     except Exception as e:
-        print(f"Event error (spy_etf_sell_event): {e}")
+        print(f"Event batch error: {e}")
         return None
 
-async def execute_sell_orders():
+async def process_netted_orders(buy_orders, sell_orders):
+    buy_orders = [dic for dic in buy_orders if dic['user_spy_net_buy_order_value'] is not None and dic['user_spy_net_buy_order_value'] > 0]
+    sell_orders = [dic for dic in sell_orders if dic['dspy_received_from_user'] is not None and dic['dspy_received_from_user'] > 0]
+    if not buy_orders and not sell_orders:
+        return None
+
+    reference_price = await run_exchange(get_latest_spy_ask)
+    if reference_price is None:
+        print("No SPY quote available, skipping netting tick")
+        return None
+    reference_price = Decimal(str(reference_price))
+
+    # Ticks may overlap, and each one consumes the carried position
+    async with netting_lock:
+        plan = net_order_flow(buy_orders, sell_orders, reference_price, netting_state['carried_quantity'])
+
+        order_id = None
+        try:
+            if plan['side'] == 'buy':
+                order_id = await run_exchange(spy_market_buy_order, plan['notional'])
+            elif plan['side'] == 'sell':
+                order_id = await run_exchange(spy_market_sell_order, plan['quantity'])
+        except Exception as e:
+            print(f"Error processing net order: {e}")
+            return None
+
+        if plan['side'] and order_id is None:
+            print("Net order was not accepted by the exchange")
+            return None
+
+        if order_id is not None:
+            net_order_reference_prices[str(order_id)] = reference_price
+            net_order_carried_quantities[str(order_id)] = plan['carried_quantity']
+            netting_state['carried_quantity'] = Decimal('0')
+
+        print(f"Netted {len(buy_orders)} buys and {len(sell_orders)} sells: {plan}")
+
+        # Every order in the tick points at the single net order (or none)
+        for dic in buy_orders:
+            dic['buy_order_alpaca_uuid'] = order_id
+        for dic in sell_orders:
+            dic['sell_order_alpaca_uuid'] = order_id
+
+        # Orders sent to the exchange are settled by the fill stage; a tick that
+        # crossed entirely internally settles right away at the reference price,
+        # in the same commit that records its orders
+        buy_fills, sell_fills = [], []
+        if order_id is None:
+            buy_fills, sell_fills = allocate_netted_fills(buy_orders, sell_orders, plan, reference_price)
+
+        recorded = await record_events(
+            (send_buy_order_to_exchange_row, buy_orders),
+            (send_sell_order_to_exchange_row, sell_orders),
+            (spy_etf_purchase_row, [dic for dic, _ in buy_fills], [allocation for _, allocation in buy_fills]),
+            (spy_etf_sell_row, [dic for dic, _ in sell_fills], [allocation for _, allocation in sell_fills]),
+        )
+
+        # Sub-minimum flow is settled now but hedged later: the platform holds
+        # the difference until a tick's net crosses MIN_EXCHANGE_NOTIONAL
+        if order_id is None and recorded is not None:
+            netting_state['carried_quantity'] = plan['remaining_quantity']
+
+    return (order_id)
+
+async def record_fills(buy_fills, sell_fills, requeued=()):
+    result = await record_events(
+        (spy_etf_purchase_row, [dic for dic, _ in buy_fills], [allocation for _, allocation in buy_fills]),
+        (spy_etf_sell_row, [dic for dic, _ in sell_fills], [allocation for _, allocation in sell_fills]),
+        (requeue_row, [dic for dic, _ in requeued], [stage for _, stage in requeued]),
+    )
+    return result is not None
+
+def requeue_unfilled(dic):
+    # Back to the stage the netting tick picked the order up from
+    stage = "USDC_RECEIVED" if dic['buy_order_alpaca_uuid'] is not None else "DSPY_RECEIVED"
+    return (dict(dic, buy_order_alpaca_uuid=None, sell_order_alpaca_uuid=None), stage)
+
+def unfilled_carry(order_id, fill):
+    # An order Alpaca closed short of its size: its orders go back to the
+    # order queue whole, and whatever did fill joins the carried position
+    # (SPY the platform still has to buy) when netting is on
+    filled_quantity = Decimal(str(fill.filled_qty or 0))
+    carried_quantity = net_order_carried_quantities.get(order_id, Decimal('0'))
+    if fill_side(fill) == 'buy':
+        return carried_quantity - filled_quantity
+    return carried_quantity + filled_quantity
+
+async def process_fills(orders):
+    # Orders recorded against the same Alpaca order (a netted tick) settle together
+    by_order_id = {}
+    for dic in orders:
+        order_id = dic['buy_order_alpaca_uuid'] or dic['sell_order_alpaca_uuid']
+        if order_id is not None:
+            by_order_id.setdefault(str(order_id), []).append(dic)
+
+    fills = await run_exchange(get_fills, list(by_order_id))
+
+    buy_fills, sell_fills, requeued = [], [], []
+    carry = Decimal('0')
+    for order_id, fill in fills.items():
+        group = by_order_id[order_id]
+        if not is_fully_filled(fill):
+            print(f"Order {order_id} closed {fill.status} with {fill.filled_qty} filled, requeueing {len(group)} orders")
+            requeued.extend(requeue_unfilled(dic) for dic in group)
+            carry += unfilled_carry(order_id, fill)
+            continue
+
+        buy_orders = [dic for dic in group if dic['buy_order_alpaca_uuid'] is not None]
+        sell_orders = [dic for dic in group if dic['buy_order_alpaca_uuid'] is None]
+
+        if len(group) == 1 and fill_side(fill) == ('buy' if buy_orders else 'sell') and not net_order_carried_quantities.get(order_id):
+            # Un-netted order, its fill is exactly its own
+            (buy_fills if buy_orders else sell_fills).append((group[0], fill))
+        else:
+            order_buy_fills, order_sell_fills = allocate_order_fill(buy_orders, sell_orders, fill)
+            buy_fills.extend(order_buy_fills)
+            sell_fills.extend(order_sell_fills)
+
+    # All fills of the tick are settled in one commit
+    if fills and await record_fills(buy_fills, sell_fills, requeued):
+        if carry and ORDER_NETTING_ENABLED:
+            async with netting_lock:
+                netting_state['carried_quantity'] += carry
+        elif carry:
+            # Only the netting loop hedges the carried position
+            print(f"[ERROR] Netting is disabled, partially filled orders left the platform {-carry} SPY to reconcile by hand")
+        forget_fills(list(fills))
+        for order_id in fills:
+            net_order_reference_prices.pop(order_id, None)
+            net_order_carried_quantities.pop(order_id, None)
+
+async def execute_fill_events():
 
     while True:
         try:
-            dspy_events = get_qualified_asks()
-            if dspy_events:
-                for event in dspy_events:
-                    event_copy = dir_copy(event, db_event_template.copy())
-                    asyncio.create_task(process_single_sell_order(event_copy))
+            snapshot_time = start_stage_tick("fill")
+            unfilled_events = await async_db_funcs.get_unfilled_orders()
+            orders = claim_stage_events("fill", unfilled_events or [], snapshot_time)
+            if orders:
+                start_stage_task("fill", orders, process_fills(orders))
 
         except Exception as e:
-            print(f"An error occurred in the sell orders execution loop: {e}")
+            print(f"An error occurred in the fill events execution loop: {e}")
+
+        await wait_for_stage("fill")
 
-        await asyncio.sleep(2.5)
+async def execute_netted_orders():
+
+    while True:
+        if await wait_for_market_open():
+            continue
+
+        try:
+            buy_snapshot = start_stage_tick("buy")
+            sell_snapshot = start_stage_tick("sell")
+            usdt_events, dspy_events = await asyncio.gather(
+                async_db_funcs.get_qualified_bids(),
+                async_db_funcs.get_qualified_asks(),
+            )
+            buy_orders = claim_stage_events("buy", usdt_events or [], buy_snapshot)
+            sell_orders = claim_stage_events("sell", dspy_events or [], sell_snapshot)
+
+            if buy_orders or sell_orders:
+                task = asyncio.create_task(process_netted_orders(buy_orders, sell_orders))
+                register_stage_task("buy", buy_orders, task)
+                register_stage_task("sell", sell_orders, task)
+
+        except Exception as e:
+            print(f"An error occurred in the netted orders execution loop: {e}")
+
+        await wait_for_stage("buy", "sell")
+        await asyncio.sleep(NETTING_WINDOW_SECONDS)
+
+async def send_initiated_transaction(kind, prepared, orders, initiated_row, hash_field):
+    # Signed before it is recorded and recorded before it is sent: the
+    # initiated event carries the hash, so a restart or a send that got no
+    # answer is recovered from it instead of sending the order again
+    for dic in orders:
+        dic[hash_field] = prepared['tx_hash']
+
+    if await record_events((initiated_row, orders)) is None:
+        await run_chain(blockchain_funcs.abandon_nonce, prepared['nonce'])
+        return None
+
+    # The completion event is written by the receipt tracker
+    try:
+        tx_hash = await run_chain(blockchain_funcs.send_prepared_transaction, prepared)
+    except Exception as e:
+        print(f"Error sending {kind} transaction: {e}")
+        track_unsent_transaction(prepared['tx_hash'], kind, orders, prepared['nonce'])
+        return None
+
+    track_transaction(tx_hash, kind, orders)
+    return (tx_hash)
 
 async def process_single_mint_action(dic):
     if (dic is None or dic['dspy_mint_filled_quantity'] is None):
@@ -99,32 +467,51 @@ async def process_single_mint_action(dic):
 
     try:
         print("Processing mint action...")
-        result = blockchain_funcs.mint(user_address, int(token_amount), string_to_bytes32(frontend_hash))
+        prepared = await run_chain(blockchain_funcs.prepare_mint, user_address, int(token_amount), string_to_bytes32(frontend_hash))
     except Exception as e:
         print(f"Error processing order: {e}")
         return None
 
-    try:
-        result = dspy_token_minting_init_event(dic)
+    if prepared is None:
+        return None
+
+    return await send_initiated_transaction('mint', prepared, [dic], dspy_token_minting_init_row, 'smart_contract_two_transaction_hash')
 
+async def process_mint_batch(orders):
+    orders = [dic for dic in orders if dic['dspy_mint_filled_quantity'] is not None]
+    if len(orders) <= 1:
+        return await process_single_mint_action(orders[0]) if orders else None
+
+    user_addresses = [dic["user_dspy_wallet_address"] for dic in orders]
+    token_amounts = [int(dspy_to_wei(dic["dspy_mint_filled_quantity"])) for dic in orders]
+    frontend_hashes = [string_to_bytes32(str(dic["frontend_hash"])) for dic in orders]
+
+    try:
+        print(f"Processing batch mint of {len(orders)} orders...")
+        prepared = await run_chain(blockchain_funcs.prepare_batch_mint, user_addresses, token_amounts, frontend_hashes)
     except Exception as e:
-        print(f"Event error (dspy minting db entry event): {e}")
+        print(f"Error processing batch: {e}")
+        return None
+
+    if prepared is None:
         return None
 
+    return await send_initiated_transaction('mint', prepared, orders, dspy_token_minting_init_row, 'smart_contract_two_transaction_hash')
+
 async def execute_mint_actions():
 
     while True:
         try:
-            mint_events = get_qualified_mints()
+            snapshot_time = start_stage_tick("mint")
+            mint_events = await async_db_funcs.get_qualified_mints()
             if mint_events:
-                for event in mint_events:
-                    event_copy = dir_copy(event, db_event_template.copy())
-                    asyncio.create_task(process_single_mint_action(event_copy))
+                dispatch_stage_batches("mint", mint_events, process_mint_batch, MINT_BATCH_SIZE, snapshot_time)
 
         except Exception as e:
             print(f"An error occurred in the mint actions execution loop: {e}")
 
-        await asyncio.sleep(2.5)
+        await wait_for_stage("mint")
+        await asyncio.sleep(BATCH_WINDOW_SECONDS)
 
 async def process_single_burn_action(dic):
     if (dic is None or dic['dspy_burning_filled_quantity'] is None):
@@ -136,32 +523,51 @@ async def process_single_burn_action(dic):
 
     try:
         print("Processing burn action...")
-        result = blockchain_funcs.burn(admin_address, int(token_amount), string_to_bytes32(frontend_hash))
+        prepared = await run_chain(blockchain_funcs.prepare_burn, admin_address, int(token_amount), string_to_bytes32(frontend_hash))
     except Exception as e:
         print(f"Error processing order: {e}")
         return None
 
-    try:
-        result = dspy_token_burning_init_event(dic)
+    if prepared is None:
+        return None
 
+    return await send_initiated_transaction('burn', prepared, [dic], dspy_token_burning_init_row, 'smart_contract_two_transaction_hash')
+
+async def process_burn_batch(orders):
+    orders = [dic for dic in orders if dic['dspy_burning_filled_quantity'] is not None]
+    if len(orders) <= 1:
+        return await process_single_burn_action(orders[0]) if orders else None
+
+    admin_address = os.getenv("WALLET_ADDRESS_ADMIN")
+    token_amounts = [int(dspy_to_wei(dic["dspy_received_from_user"])) for dic in orders]
+    frontend_hashes = [string_to_bytes32(str(dic["frontend_hash"])) for dic in orders]
+
+    try:
+        print(f"Processing batch burn of {len(orders)} orders...")
+        prepared = await run_chain(blockchain_funcs.prepare_batch_burn, admin_address, token_amounts, frontend_hashes)
     except Exception as e:
-        print(f"Event error (dspy burning db event): {e}")
+        print(f"Error processing batch: {e}")
         return None
 
+    if prepared is None:
+        return None
+
+    return await send_initiated_transaction('burn', prepared, orders, dspy_token_burning_init_row, 'smart_contract_two_transaction_hash')
+
 async def execute_burn_actions():
 
     while True:
         try:
-            burn_events = get_qualified_burns()
+            snapshot_time = start_stage_tick("burn")
+            burn_events = await async_db_funcs.get_qualified_burns()
             if burn_events:
-                for event in burn_events:
-                    event_copy = dir_copy(event, db_event_template.copy())
-                    asyncio.create_task(process_single_burn_action(event_copy))
+                dispatch_stage_batches("burn", burn_events, process_burn_batch, BURN_BATCH_SIZE, snapshot_time)
 
         except Exception as e:
             print(f"An error occurred in the burn actions execution loop: {e}")
 
-        await asyncio.sleep(2.5)
+        await wait_for_stage("burn")
+        await asyncio.sleep(BATCH_WINDOW_SECONDS)
 
 async def process_single_redemption_action(dic):
 
@@ -172,47 +578,53 @@ async def process_single_redemption_action(dic):
     token_amount = usdc_to_wei(dic["user_spy_sell_net_order_value_usd"])
 
     try:
-        result = usdc_redemption_transfer_initiated(dic)
+        prepared = await run_chain(blockchain_funcs.prepare_usdc_transfer, user_address, token_amount)
     except Exception as e:
-        print(f"Event error (usdc redemption db event): {e}")
+        print(f"Error processing order: {e}")
         return None
 
-    try:
-        result = blockchain_funcs.transfer_usdc(user_address, token_amount)
+    if (prepared is None):
+        print("Blockchain Transfer failed")
+        return (None)
 
-        if (result is None):
-            print("Blockchain Transfer failed")
-            return (None)
-
-        if result['status'] == 1:
-            dic["redemption_usdc_sent_to_user"] = dic["user_spy_sell_net_order_value_usd"]
-            sell_order_filled_usdc_sent(dic)
-
-    except Exception as e:
-        print(f"Error processing order: {e}")
-        return None
+    return await send_initiated_transaction('usdc', prepared, [dic], usdc_redemption_transfer_initiated_row, 'smart_contract_one_transaction_hash')
 
 
 async def execute_redemption_actions():
 
     while True:
         try:
-            redemption_events = get_qualified_redemptions()
+            snapshot_time = start_stage_tick("redemption")
+            redemption_events = await async_db_funcs.get_qualified_redemptions()
             if redemption_events:
                 for event in redemption_events:
-                    event_copy = dir_copy(event, db_event_template.copy())
-                    asyncio.create_task(process_single_redemption_action(event_copy))
+                    dispatch_stage_task("redemption", event, process_single_redemption_action, snapshot_time)
 
         except Exception as e:
             print(f"An error occurred in the redemptions actions execution loop: {e}")
 
-        await asyncio.sleep(2.5)
+        await wait_for_stage("redemption")
 
 
 async def run_buy_sell_loops():
+    # order_state and the indexes must exist before any stage writes an event
+    await run_db(prepare_database)
+
+    # New fills wake the fill stage straight from the fill service thread
+    loop = asyncio.get_running_loop()
+    add_fill_listener(lambda: loop.call_soon_threadsafe(stage_wakeups["fill"].set))
+    start_fill_service()
+
+    if ORDER_NETTING_ENABLED:
+        order_loops = [execute_netted_orders()]
+    else:
+        order_loops = [execute_sell_orders(), execute_buy_orders()]
+
     await asyncio.gather(
-        execute_sell_orders(),
-        execute_buy_orders(),
+        listen_for_events(),
+        run_receipt_tracker(),
+        *order_loops,
+        execute_fill_events(),
         execute_mint_actions(),
         execute_burn_actions(),
         execute_redemption_actions(),
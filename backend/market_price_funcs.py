@@ -1,12 +1,86 @@
 import requests
 import json
 import os
+import time
+import threading
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 from alpaca.data.requests import StockLatestQuoteRequest
 from alpaca.data.historical import StockHistoricalDataClient
+from alpaca.data.live import StockDataStream
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Quotes are served from memory; a quote older than this is refreshed first
+QUOTE_MAX_STALENESS_SECONDS = float(os.getenv("QUOTE_MAX_STALENESS_SECONDS", "2"))
+# "stream" subscribes to Alpaca's websocket, "poll" refreshes from REST in one shared thread
+QUOTE_SOURCE = os.getenv("QUOTE_SOURCE", "stream")
+QUOTE_POLL_SECONDS = float(os.getenv("QUOTE_POLL_SECONDS", "1"))
+
+ALPACA_TRADING_URL = os.getenv("ALPACA_TRADING_URL", "https://paper-api.alpaca.markets")
+# How far ahead the trading calendar is cached
+MARKET_CALENDAR_DAYS = int(os.getenv("MARKET_CALENDAR_DAYS", "14"))
+MARKET_TIMEZONE = ZoneInfo("America/New_York")
+
+price_client = StockHistoricalDataClient(os.getenv('API_KEY'), os.getenv('SECRET_KEY'))
+
+quote_lock = threading.Lock()
+fetch_lock = threading.Lock()
+latest_quote = {'bid': None, 'ask': None, 'updated_at': 0}
+quote_service = {'thread': None}
+
+def store_quote(bid_price, ask_price):
+    with quote_lock:
+        latest_quote['bid'] = bid_price
+        latest_quote['ask'] = ask_price
+        latest_quote['updated_at'] = time.monotonic()
+
+def fetch_spy_quote():
+    request_params = StockLatestQuoteRequest(symbol_or_symbols="SPY")
+    latest_spy_price = price_client.get_stock_latest_quote(request_params)
+    quote = latest_spy_price['SPY']
+    store_quote(quote.bid_price, quote.ask_price)
+
+async def on_spy_quote(quote):
+    store_quote(quote.bid_price, quote.ask_price)
+
+def run_quote_stream():
+    stream = StockDataStream(os.getenv('API_KEY'), os.getenv('SECRET_KEY'))
+    stream.subscribe_quotes(on_spy_quote, "SPY")
+    stream.run()
+
+def run_quote_poller():
+    while True:
+        try:
+            fetch_spy_quote()
+        except Exception as e:
+            print(f"An error occurred refreshing the SPY quote: {e}")
+        time.sleep(QUOTE_POLL_SECONDS)
+
+def start_quote_service():
+    with quote_lock:
+        if quote_service['thread'] is not None and quote_service['thread'].is_alive():
+            return
+        target = run_quote_stream if QUOTE_SOURCE == "stream" else run_quote_poller
+        quote_service['thread'] = threading.Thread(target=target, name="spy-quote-service", daemon=True)
+        quote_service['thread'].start()
+
+def quote_is_fresh():
+    with quote_lock:
+        return time.monotonic() - latest_quote['updated_at'] <= QUOTE_MAX_STALENESS_SECONDS
+
+def get_spy_quote():
+    start_quote_service()
+    # Stream gaps (e.g. no quotes while the market is closed) fall back to a
+    # REST call, shared by every caller that finds the quote stale at once
+    if not quote_is_fresh():
+        with fetch_lock:
+            if not quote_is_fresh():
+                fetch_spy_quote()
+    with quote_lock:
+        return dict(latest_quote)
+
 def get_approx_spy_value(usdc):
     spy = get_latest_spy_ask()
     return round(usdc/spy, 9)
@@ -17,28 +91,91 @@ def get_approx_spy_sale_value(dspy):
 
 def get_latest_spy_ask():
     try:
-        #start = time.perf_counter()
-        price_client = StockHistoricalDataClient(os.getenv('API_KEY'), os.getenv('SECRET_KEY'))
-        request_params = StockLatestQuoteRequest(symbol_or_symbols="SPY")
-        latest_spy_price = price_client.get_stock_latest_quote(request_params)
-        ask_price = latest_spy_price['SPY'].ask_price
-
-        #end = time.perf_counter()
-        #time_taken = end - start
-        #print(f"Request took {end - start:.4f} seconds")
+        return (get_spy_quote()['ask'])
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        return (None)
 
-        return (ask_price)
+def get_latest_spy_bid():
+    try:
+        return (get_spy_quote()['bid'])
     except Exception as e:
         print(f"An error occurred: {e}")
         return (None)
 
-def is_market_open():
-    url = "https://paper-api.alpaca.markets/v2/clock"
-    headers = {
-        "accept": "application/json",
-        "APCA-API-KEY-ID": os.getenv('API_KEY'),
-        "APCA-API-SECRET-KEY": os.getenv('SECRET_KEY')
+alpaca_session = requests.Session()
+alpaca_session.headers.update({
+    "accept": "application/json",
+    "APCA-API-KEY-ID": os.getenv('API_KEY'),
+    "APCA-API-SECRET-KEY": os.getenv('SECRET_KEY')
+})
+
+clock_lock = threading.Lock()
+# clock: Alpaca's answer, trusted until its next open/close
+# sessions: (open, close) datetimes from the calendar, used after that
+market_clock = {'clock': None, 'clock_valid_until': None, 'sessions': []}
+
+def parse_alpaca_time(value):
+    return datetime.fromisoformat(value).astimezone(timezone.utc)
+
+def refresh_market_clock():
+    response = alpaca_session.get(f"{ALPACA_TRADING_URL}/v2/clock")
+    response.raise_for_status()
+    clock = json.loads(response.text)
+
+    today = datetime.now(MARKET_TIMEZONE).date()
+    response = alpaca_session.get(f"{ALPACA_TRADING_URL}/v2/calendar", params={
+        "start": today.isoformat(),
+        "end": (today + timedelta(days=MARKET_CALENDAR_DAYS)).isoformat()
+    })
+    response.raise_for_status()
+
+    sessions = []
+    for day in json.loads(response.text):
+        # Calendar times are exchange-local, e.g. {"date": "2025-07-03", "open": "09:30", "close": "13:00"}
+        market_open = datetime.strptime(f"{day['date']} {day['open']}", "%Y-%m-%d %H:%M").replace(tzinfo=MARKET_TIMEZONE)
+        market_close = datetime.strptime(f"{day['date']} {day['close']}", "%Y-%m-%d %H:%M").replace(tzinfo=MARKET_TIMEZONE)
+        sessions.append((market_open.astimezone(timezone.utc), market_close.astimezone(timezone.utc)))
+
+    market_clock['clock'] = clock
+    market_clock['clock_valid_until'] = parse_alpaca_time(clock['next_close'] if clock['is_open'] else clock['next_open'])
+    market_clock['sessions'] = sessions
+
+def local_market_clock(now):
+    if now < market_clock['clock_valid_until']:
+        clock = market_clock['clock']
+        return {
+            'timestamp': now.isoformat(),
+            'is_open': clock['is_open'],
+            'next_open': parse_alpaca_time(clock['next_open']).isoformat(),
+            'next_close': parse_alpaca_time(clock['next_close']).isoformat(),
+        }
+
+    sessions = [session for session in market_clock['sessions'] if session[1] > now]
+    if len(sessions) < 2:
+        return None
+
+    is_open = sessions[0][0] <= now
+    next_open = sessions[1][0] if is_open else sessions[0][0]
+    return {
+        'timestamp': now.isoformat(),
+        'is_open': is_open,
+        'next_open': next_open.isoformat(),
+        'next_close': sessions[0][1].isoformat(),
     }
-    response = requests.get(url, headers=headers)
-    response = json.loads(response.text)
-    return (response)
+
+def is_market_open():
+    # Same shape as Alpaca's /v2/clock response, answered from the cache
+    now = datetime.now(timezone.utc)
+    with clock_lock:
+        clock = local_market_clock(now) if market_clock['clock'] else None
+        if clock is None:
+            refresh_market_clock()
+            clock = local_market_clock(now)
+    return (clock)
+
+def seconds_until_market_open():
+    clock = is_market_open()
+    if clock['is_open']:
+        return 0
+    return max((datetime.fromisoformat(clock['next_open']) - datetime.now(timezone.utc)).total_seconds(), 0)
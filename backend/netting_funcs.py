@@ -0,0 +1,115 @@
+from types import SimpleNamespace
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
+from alpaca.trading.enums import OrderSide
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+# Net flow below this (in USD) is absorbed internally instead of sent to Alpaca
+MIN_EXCHANGE_NOTIONAL = Decimal(os.getenv("MIN_EXCHANGE_NOTIONAL", "1"))
+
+SPY_QUANTITY_STEP = Decimal('0.000000001')
+NOTIONAL_STEP = Decimal('0.01')
+PRICE_STEP = Decimal('0.000001')
+
+# Alpaca order id -> reference price its tick was netted at, kept until the fill arrives
+net_order_reference_prices = {}
+# Alpaca order id -> carried quantity its tick folded in, kept until the fill arrives
+net_order_carried_quantities = {}
+
+# SPY the platform still has to buy (negative: sell) for net flow it settled
+# internally because it was below MIN_EXCHANGE_NOTIONAL. Each tick folds it
+# into its own net, so the unhedged position never exceeds the minimum.
+netting_state = {'carried_quantity': Decimal('0')}
+
+def total_buy_notional(buy_orders):
+    return sum((Decimal(o['user_spy_net_buy_order_value']) for o in buy_orders), Decimal('0'))
+
+def total_sell_quantity(sell_orders):
+    return sum((Decimal(o['dspy_received_from_user']) for o in sell_orders), Decimal('0'))
+
+def net_order_flow(buy_orders, sell_orders, reference_price, carried_quantity=Decimal('0')):
+    """
+    Buys are USD notional, sells are SPY quantity; the reference price puts
+    them on the same scale so only the difference goes to the exchange.
+
+    Returns:
+        dict: 'side' ('buy', 'sell' or None), the exchange 'notional' or
+        'quantity', the 'carried_quantity' folded in, and for side None the
+        'remaining_quantity' to carry into the next tick
+    """
+    buy_notional = total_buy_notional(buy_orders)
+    sell_quantity = total_sell_quantity(sell_orders)
+    net_notional = buy_notional - (sell_quantity - carried_quantity) * reference_price
+
+    if abs(net_notional) < MIN_EXCHANGE_NOTIONAL:
+        return {'side': None, 'carried_quantity': carried_quantity, 'remaining_quantity': net_notional / reference_price}
+
+    if net_notional > 0:
+        return {'side': 'buy', 'notional': net_notional.quantize(NOTIONAL_STEP, rounding=ROUND_DOWN), 'carried_quantity': carried_quantity}
+
+    quantity = sell_quantity - buy_notional / reference_price - carried_quantity
+    return {'side': 'sell', 'quantity': quantity.quantize(SPY_QUANTITY_STEP, rounding=ROUND_DOWN), 'carried_quantity': carried_quantity}
+
+def fill_side(fill):
+    return 'buy' if fill.side == OrderSide.BUY else 'sell'
+
+def allocate_order_fill(buy_orders, sell_orders, fill):
+    # Allocates an Alpaca fill to every order that was recorded against it
+    side = fill_side(fill)
+    reference_price = net_order_reference_prices.get(str(fill.id))
+    if reference_price is None:
+        # Netting context lost (e.g. restart): cross at the fill price
+        reference_price = Decimal(str(fill.filled_avg_price))
+    carried_quantity = net_order_carried_quantities.get(str(fill.id), Decimal('0'))
+    return allocate_netted_fills(buy_orders, sell_orders, {'side': side, 'carried_quantity': carried_quantity}, reference_price, fill)
+
+def allocate_netted_fills(buy_orders, sell_orders, plan, reference_price, fill=None):
+    """
+    Splits one tick's SPY between its buyers and its USD between its sellers.
+
+    The side that crossed internally trades at the reference price; the side
+    that also went to the exchange shares its pool (crossed amount plus the
+    Alpaca fill) pro rata, so both sides balance to the cent. SPY the tick
+    bought or sold for the platform's carried position stays with the
+    platform, valued at the reference price.
+
+    Returns:
+        tuple: ([(order, fill)], [(order, fill)]) for buys and sells, where each
+        fill has the filled_qty / filled_avg_price shape of an Alpaca order
+    """
+    buy_notional = total_buy_notional(buy_orders)
+    sell_quantity = total_sell_quantity(sell_orders)
+    carried_quantity = plan.get('carried_quantity', Decimal('0'))
+
+    if plan['side'] == 'buy':
+        total_buy_quantity = sell_quantity + Decimal(str(fill.filled_qty)) - carried_quantity
+        total_sell_value = sell_quantity * reference_price
+    elif plan['side'] == 'sell':
+        total_buy_quantity = buy_notional / reference_price
+        total_sell_value = (buy_notional + Decimal(str(fill.filled_qty)) * Decimal(str(fill.filled_avg_price))
+                            + carried_quantity * reference_price)
+    else:
+        total_buy_quantity = buy_notional / reference_price
+        total_sell_value = sell_quantity * reference_price
+
+    buy_price = buy_notional / total_buy_quantity if total_buy_quantity > 0 else reference_price
+    sell_price = total_sell_value / sell_quantity if sell_quantity else reference_price
+
+    buy_fills = []
+    for order in buy_orders:
+        quantity = (Decimal(order['user_spy_net_buy_order_value']) / buy_price).quantize(SPY_QUANTITY_STEP, rounding=ROUND_DOWN)
+        buy_fills.append((order, SimpleNamespace(
+            filled_qty=quantity,
+            filled_avg_price=buy_price.quantize(PRICE_STEP, rounding=ROUND_HALF_UP)
+        )))
+
+    sell_fills = []
+    for order in sell_orders:
+        sell_fills.append((order, SimpleNamespace(
+            filled_qty=Decimal(order['dspy_received_from_user']),
+            filled_avg_price=sell_price.quantize(PRICE_STEP, rounding=ROUND_HALF_UP)
+        )))
+
+    return buy_fills, sell_fills
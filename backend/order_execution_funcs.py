@@ -1,9 +1,13 @@
 import os
+import time
+import threading
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
-from alpaca.trading.requests import LimitOrderRequest
+from alpaca.trading.requests import LimitOrderRequest, GetOrdersRequest
 from alpaca.trading.requests import MarketOrderRequest
-from alpaca.trading.enums import OrderSide, TimeInForce, OrderStatus
+from alpaca.trading.enums import OrderSide, TimeInForce, OrderStatus, QueryOrderStatus
 from alpaca.trading.client import TradingClient
+from alpaca.trading.stream import TradingStream
 from alpaca.data.historical import StockHistoricalDataClient
 
 load_dotenv()
@@ -11,6 +15,12 @@ load_dotenv()
 trading_client = TradingClient(os.getenv('API_KEY'), os.getenv('SECRET_KEY'), paper=True)
 price_client = StockHistoricalDataClient(os.getenv('API_KEY'), os.getenv('SECRET_KEY'))
 
+# "stream" listens to Alpaca trade_updates, "poll" lists closed orders in one shared poller.
+# Either way a missing fill triggers at most one batched get_orders per FILL_POLL_SECONDS.
+FILL_SOURCE = os.getenv("FILL_SOURCE", "stream")
+FILL_POLL_SECONDS = float(os.getenv("FILL_POLL_SECONDS", "2"))
+FILL_LOOKBACK_HOURS = float(os.getenv("FILL_LOOKBACK_HOURS", "72"))
+
 def spy_limit_order(user_bid_price, quantity):
     try:
         limit_order_buy = LimitOrderRequest(
@@ -68,3 +78,99 @@ def order_details(order_id):
     except Exception as e:
         print(f"Failed to get order details on the exchange {e}")
         return None
+
+# Statuses after which Alpaca fills no more of the order; filled_qty is final
+FINAL_ORDER_STATUSES = {OrderStatus.FILLED, OrderStatus.CANCELED, OrderStatus.EXPIRED, OrderStatus.REJECTED}
+FILL_STATUSES = FINAL_ORDER_STATUSES | {OrderStatus.PARTIALLY_FILLED}
+FILL_EVENTS = {"fill", "partial_fill", "canceled", "expired", "rejected"}
+
+fill_lock = threading.Lock()
+# Alpaca order id -> latest order with fills (partial until its status is final)
+order_fills = {}
+# Alpaca order id -> when its fill was settled, so polls within the lookback skip it
+settled_fills = {}
+fill_listeners = []
+fill_service = {'thread': None, 'last_poll': 0}
+
+def add_fill_listener(callback):
+    # callback() runs on the fill service thread whenever an order's fill becomes final
+    fill_listeners.append(callback)
+
+def is_final(order):
+    return order.status in FINAL_ORDER_STATUSES
+
+def is_fully_filled(order):
+    return order.status == OrderStatus.FILLED
+
+def record_fill(order):
+    if order.status not in FILL_STATUSES:
+        return
+    with fill_lock:
+        order_id = str(order.id)
+        recorded = order_fills.get(order_id)
+        if order_id in settled_fills or (recorded is not None and is_final(recorded)):
+            return
+        order_fills[order_id] = order
+    if is_final(order):
+        for callback in fill_listeners:
+            callback()
+
+def poll_fills():
+    fill_service['last_poll'] = time.monotonic()
+    request_params = GetOrdersRequest(
+        status=QueryOrderStatus.CLOSED,
+        symbols=["SPY"],
+        after=datetime.now(timezone.utc) - timedelta(hours=FILL_LOOKBACK_HOURS),
+        limit=500
+    )
+    for order in trading_client.get_orders(filter=request_params):
+        record_fill(order)
+
+async def on_trade_update(data):
+    if data.event in FILL_EVENTS:
+        record_fill(data.order)
+
+def run_fill_stream():
+    stream = TradingStream(os.getenv('API_KEY'), os.getenv('SECRET_KEY'), paper=True)
+    stream.subscribe_trade_updates(on_trade_update)
+    stream.run()
+
+def run_fill_poller():
+    while True:
+        try:
+            poll_fills()
+        except Exception as e:
+            print(f"Failed to poll order fills on the exchange {e}")
+        time.sleep(FILL_POLL_SECONDS)
+
+def start_fill_service():
+    with fill_lock:
+        if fill_service['thread'] is not None and fill_service['thread'].is_alive():
+            return
+        target = run_fill_stream if FILL_SOURCE == "stream" else run_fill_poller
+        fill_service['thread'] = threading.Thread(target=target, name="alpaca-fill-service", daemon=True)
+        fill_service['thread'].start()
+
+def get_fills(order_ids):
+    # Fills that happened while the stream was down are caught by one batched poll
+    order_ids = [str(order_id) for order_id in order_ids]
+    with fill_lock:
+        missing = [order_id for order_id in order_ids if order_id not in order_fills or not is_final(order_fills[order_id])]
+    if missing and time.monotonic() - fill_service['last_poll'] > FILL_POLL_SECONDS:
+        try:
+            poll_fills()
+        except Exception as e:
+            print(f"Failed to poll order fills on the exchange {e}")
+    with fill_lock:
+        return {order_id: order_fills[order_id] for order_id in order_ids if order_id in order_fills and is_final(order_fills[order_id])}
+
+def forget_fills(order_ids):
+    # Settled fills stay marked until they fall out of the poll's lookback
+    now = time.monotonic()
+    with fill_lock:
+        for order_id in order_ids:
+            order_fills.pop(str(order_id), None)
+            settled_fills[str(order_id)] = now
+        expired = now - FILL_LOOKBACK_HOURS * 3600
+        for order_id in [order_id for order_id, settled_at in settled_fills.items() if settled_at < expired]:
+            del settled_fills[order_id]
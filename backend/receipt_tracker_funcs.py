@@ -0,0 +1,272 @@
+from event_funcs_utils import dir_copy, db_event_template
+from blockchain_utils import string_to_bytes32
+from event_funcs import dspy_order_filled_token_minted_row, dspy_token_burned_row, sell_order_filled_usdc_sent_row, requeue_row, async_insert_event_batch
+from executor_funcs import run_chain
+from dotenv import load_dotenv
+import os
+import time
+import asyncio
+import blockchain_funcs
+import async_db_funcs
+
+load_dotenv()
+
+RECEIPT_POLL_SECONDS = float(os.getenv("RECEIPT_POLL_SECONDS", "2"))
+NONCE_GAP_CHECK_SECONDS = float(os.getenv("NONCE_GAP_CHECK_SECONDS", "30"))
+# A transaction without a receipt for this long is looked up on the node;
+# if the node has never heard of it, it was dropped
+TX_DROP_SECONDS = float(os.getenv("TX_DROP_SECONDS", "600"))
+# Times an order is requeued after its transaction reverted before it is
+# left at *_INITIATED for a manual look
+TX_MAX_ATTEMPTS = int(os.getenv("TX_MAX_ATTEMPTS", "3"))
+
+# tx_hash -> {'kind': 'mint' | 'burn' | 'usdc', 'orders': [event dict, ...], 'since': monotonic time, 'batch': bool}
+# A batch mint/burn carries every order it covers under a single hash.
+pending_transactions = {}
+
+# tx_hash -> nonce of tracked transactions that may never be mined: their
+# nonce was filled by fill_nonce_gaps, their send failed, or they sat
+# unmined too long. Once that nonce is mined without their receipt they
+# can never be mined.
+watched_nonces = {}
+
+# frontend_hash -> transactions of the order that reverted
+failed_attempts = {}
+
+# Stage an order goes back to when its transaction will never be mined, and
+# the field that held that transaction's hash. Redemptions keep the USDC
+# transfer hash in smart_contract_one_transaction_hash, the hash column the
+# sell flow leaves free.
+REQUEUE_STAGES = {
+    'mint': ("SPY_ETF_PURCHASED", 'smart_contract_two_transaction_hash'),
+    'burn': ("SPY_ETF_SOLD", 'smart_contract_two_transaction_hash'),
+    'usdc': ("DSPY_TOKEN_BURNED", 'smart_contract_one_transaction_hash'),
+}
+
+INITIATED_STAGES = {
+    'mint': "DSPY_TOKEN_MINTING_INITIATED",
+    'burn': "DSPY_TOKEN_BURNING_INITIATED",
+    'usdc': "REDEMPTION_USDC_TRANSFER_INITIATED",
+}
+
+def track_transaction(tx_hash, kind, orders, since=None, batch=None):
+    pending_transactions[tx_hash] = {
+        'kind': kind,
+        'orders': orders,
+        'since': since or time.monotonic(),
+        'batch': len(orders) > 1 if batch is None else batch,
+    }
+
+def track_unsent_transaction(tx_hash, kind, orders, nonce):
+    # The send failed, but may still have reached the node: it completes if a
+    # receipt shows up, and is requeued once another transaction takes its nonce
+    track_transaction(tx_hash, kind, orders)
+    watched_nonces[tx_hash] = nonce
+
+async def recover_pending_transactions():
+    # Every initiated event records its tx hash, so in-flight transactions
+    # are picked up again after a restart
+    for kind, stage in INITIATED_STAGES.items():
+        hash_field = REQUEUE_STAGES[kind][1]
+        for event in await async_db_funcs.get_orders_at_stage(stage):
+            tx_hash = event[hash_field]
+            if not tx_hash:
+                continue
+            order = dir_copy(event, db_event_template.copy())
+            if tx_hash in pending_transactions:
+                pending_transactions[tx_hash]['orders'].append(order)
+                pending_transactions[tx_hash]['batch'] = True
+            else:
+                track_transaction(tx_hash, kind, [order])
+
+def settled_orders(kind, orders, receipt, batch):
+    # (orders the receipt settled, orders it skipped)
+    if not batch:
+        return orders, []
+
+    # Map a batch receipt back to orders through the per-order events it emitted
+    topic = blockchain_funcs.MINT_PROCESSED_TOPIC if kind == 'mint' else blockchain_funcs.BURN_PROCESSED_TOPIC
+    processed = blockchain_funcs.processed_frontend_hashes(receipt, topic)
+    settled, skipped = [], []
+    for order in orders:
+        if string_to_bytes32(str(order['frontend_hash'])).hex() in processed:
+            settled.append(order)
+        else:
+            print(f"[WARN] Order {order['frontend_hash']} not processed by batch {kind}.")
+            skipped.append(order)
+    return settled, skipped
+
+def complete_order(kind, tx_hash, order, gas_paid):
+    # Fills in the receipt details and returns the row builder of the completion event
+    if kind == 'mint':
+        order['smart_contract_two_transaction_hash'] = tx_hash
+        order['gas_paid_for_sending_dspy_to_user'] = gas_paid
+        return dspy_order_filled_token_minted_row
+
+    if kind == 'burn':
+        order['smart_contract_two_transaction_hash'] = tx_hash
+        order['gas_paid_for_sending_dspy_to_smart_contract'] = gas_paid
+        return dspy_token_burned_row
+
+    if kind == 'usdc':
+        order['smart_contract_one_transaction_hash'] = tx_hash
+        order['gas_paid_for_sending_usdc'] = gas_paid
+        order['redemption_usdc_sent_to_user'] = order['user_spy_sell_net_order_value_usd']
+        return sell_order_filled_usdc_sent_row
+
+    return None
+
+async def complete_transaction(tx_hash, tracked, receipt):
+    # Returns the orders whose completion event could not be written
+    kind = tracked['kind']
+
+    if not blockchain_funcs.receipt_succeeded(receipt):
+        print(f"❌ {kind} transaction {tx_hash} failed.")
+        try:
+            await run_chain(blockchain_funcs.print_revert_reason, tx_hash)
+        except Exception as e:
+            print(f"Could not fetch revert reason: {e}")
+        return await requeue_failed_orders(tx_hash, kind, tracked['orders'])
+
+    orders, skipped = settled_orders(kind, tracked['orders'], receipt, tracked['batch'])
+    # Orders a batch skipped are requeued like those of a failed transaction
+    unrecorded = await requeue_failed_orders(tx_hash, kind, skipped) if skipped else []
+    if not orders:
+        return unrecorded
+
+    # Gas of a batch is shared equally by the orders it settled
+    gas_paid = blockchain_funcs.receipt_gas_paid(receipt) / len(orders)
+
+    row_builder = None
+    for order in orders:
+        row_builder = complete_order(kind, tx_hash, order, gas_paid)
+    if row_builder is None:
+        return unrecorded + orders
+
+    # Every order settled by the transaction completes in one commit
+    if await async_insert_event_batch((row_builder, orders)) is None:
+        return unrecorded + orders
+    for order in orders:
+        failed_attempts.pop(order['frontend_hash'], None)
+    return unrecorded
+
+async def complete_tracked_transaction(tx_hash, tracked, receipt):
+    try:
+        unrecorded = await complete_transaction(tx_hash, tracked, receipt)
+    except Exception as e:
+        print(f"Error completing transaction {tx_hash}: {e}")
+        unrecorded = tracked['orders']
+
+    # A failed DB write (completion or requeue) is retried on the next poll
+    if unrecorded:
+        track_transaction(tx_hash, tracked['kind'], unrecorded, tracked['since'], tracked['batch'])
+
+async def requeue_orders(kind, orders):
+    # Puts the orders back in the queue of the stage that sent the
+    # transaction; returns False if that could not be written
+    stage, hash_field = REQUEUE_STAGES[kind]
+    orders = [dict(order, **{hash_field: None}) for order in orders]
+    try:
+        requeued = await async_insert_event_batch((requeue_row, orders, [stage] * len(orders)))
+    except Exception as e:
+        print(f"Error requeueing orders at {stage}: {e}")
+        requeued = None
+    return requeued is not None
+
+async def requeue_failed_orders(tx_hash, kind, orders):
+    # Returns the orders whose requeue could not be written
+    retry = []
+    for order in orders:
+        attempts = failed_attempts.get(order['frontend_hash'], 0) + 1
+        if attempts < TX_MAX_ATTEMPTS:
+            retry.append(order)
+        else:
+            print(f"[ERROR] Order {order['frontend_hash']} failed {attempts} {kind} transactions, leaving it at {INITIATED_STAGES[kind]}.")
+            failed_attempts.pop(order['frontend_hash'], None)
+    if not retry:
+        return []
+
+    print(f"[WARN] Requeueing {len(retry)} orders of failed {kind} transaction {tx_hash}.")
+    if not await requeue_orders(kind, retry):
+        return retry
+    for order in retry:
+        failed_attempts[order['frontend_hash']] = failed_attempts.get(order['frontend_hash'], 0) + 1
+    return []
+
+async def requeue_transaction(tx_hash, tracked, reason):
+    print(f"[WARN] {tracked['kind']} transaction {tx_hash} {reason}, requeueing {len(tracked['orders'])} orders.")
+    if not await requeue_orders(tracked['kind'], tracked['orders']):
+        # Retried on the next poll
+        pending_transactions[tx_hash] = tracked
+        return False
+    return True
+
+async def requeue_unminable_transactions(mined_nonce, receipts):
+    requeues = {}
+    for tx_hash, nonce in list(watched_nonces.items()):
+        if tx_hash not in pending_transactions:
+            del watched_nonces[tx_hash]
+        elif tx_hash not in receipts and nonce < mined_nonce:
+            requeues[tx_hash] = requeue_transaction(tx_hash, pending_transactions.pop(tx_hash), "can no longer be mined")
+    results = await asyncio.gather(*requeues.values())
+    for tx_hash, requeued in zip(requeues, results):
+        if requeued:
+            del watched_nonces[tx_hash]
+
+async def check_stale_transactions():
+    # Transactions unmined for TX_DROP_SECONDS: the node either still has them
+    # (watch their nonce) or never heard of them (dropped, e.g. a transfer
+    # signed and recorded right before a restart but never sent)
+    now = time.monotonic()
+    stale = [
+        tx_hash for tx_hash, tracked in pending_transactions.items()
+        if tx_hash not in watched_nonces and now - tracked['since'] > TX_DROP_SECONDS
+    ]
+    if not stale:
+        return
+
+    nonces = await run_chain(blockchain_funcs.get_transaction_nonces, stale)
+    requeues = []
+    for tx_hash in stale:
+        if tx_hash in nonces:
+            watched_nonces[tx_hash] = nonces[tx_hash]
+        elif tx_hash in pending_transactions:
+            requeues.append(requeue_transaction(tx_hash, pending_transactions.pop(tx_hash), "was dropped"))
+    if requeues:
+        await asyncio.gather(*requeues)
+
+async def run_receipt_tracker():
+    try:
+        await recover_pending_transactions()
+    except Exception as e:
+        print(f"Failed to recover pending transactions: {e}")
+
+    last_gap_check = time.monotonic()
+
+    while True:
+        try:
+            if pending_transactions:
+                # Read before the receipts, so a watched transaction mined in
+                # between is not mistaken for one that never will be
+                mined_nonce = await run_chain(blockchain_funcs.get_mined_nonce) if watched_nonces else None
+                receipts = await run_chain(blockchain_funcs.get_transaction_receipts, list(pending_transactions))
+                completions = []
+                for tx_hash, receipt in receipts.items():
+                    tracked = pending_transactions.pop(tx_hash, None)
+                    if tracked:
+                        completions.append(complete_tracked_transaction(tx_hash, tracked, receipt))
+                if completions:
+                    await asyncio.gather(*completions)
+                if mined_nonce is not None:
+                    await requeue_unminable_transactions(mined_nonce, receipts)
+
+                if time.monotonic() - last_gap_check > NONCE_GAP_CHECK_SECONDS:
+                    last_gap_check = time.monotonic()
+                    replaced = await run_chain(blockchain_funcs.fill_nonce_gaps, blockchain_funcs.get_rpc_client())
+                    watched_nonces.update({h: n for h, n in replaced.items() if h in pending_transactions})
+                    await check_stale_transactions()
+
+        except Exception as e:
+            print(f"An error occurred in the receipt tracker loop: {e}")
+
+        await asyncio.sleep(RECEIPT_POLL_SECONDS)
@@ -0,0 +1,46 @@
+import os
+import sys
+import pytest
+from dotenv import load_dotenv
+
+load_dotenv()
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(script_dir)
+sys.path.insert(0, backend_dir)
+
+import db_funcs
+
+# The EXPLAIN check needs the pipeline database (USER/PASSWORD/HOST/PORT/DBNAME in .env)
+requires_database = pytest.mark.skipif(not os.getenv("HOST"), reason="no database configured")
+
+def test_explain_statements_render_in_parameters():
+    # Raw driver SQL must not carry SQLAlchemy's POSTCOMPILE placeholders
+    for name, (sql, params) in db_funcs.explain_statements().items():
+        assert "POSTCOMPILE" not in sql, name
+        assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT"), name
+        for param in params:
+            assert f"%({param})s" in sql, (name, param)
+
+    sql, params = db_funcs.explain_statements()['get_orders_at_stage']
+    assert params == {'stage_1_1': "USDC_RECEIVED"}
+    print("✅ EXPLAIN statements are fully rendered")
+
+@requires_database
+def test_explain_index_usage():
+    db_funcs.init_order_state()
+    db_funcs.ensure_indexes()
+
+    report = db_funcs.explain_index_usage()
+    assert set(report) == {
+        'find_buy_order', 'find_sell_order', 'find_bought_order', 'find_sold_order',
+        'get_orders_at_stage', 'get_all_orders',
+    }
+    for name, usage in report.items():
+        assert usage['uses_index'], (name, usage)
+        print(f"✅ {name} uses {', '.join(usage['indexes'])}")
+
+if __name__ == "__main__":
+    test_explain_statements_render_in_parameters()
+    if os.getenv("HOST"):
+        test_explain_index_usage()
@@ -0,0 +1,44 @@
+import os
+import sys
+import uuid
+import base64
+import pytest
+from datetime import datetime, timezone
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+backend_dir = os.path.dirname(script_dir)
+sys.path.insert(0, backend_dir)
+
+import db_funcs
+
+def test_cursor_round_trip():
+    updated_at = datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc)
+    frontend_hash = uuid.uuid4()
+    cursor = db_funcs.encode_order_cursor(updated_at, frontend_hash)
+    assert db_funcs.decode_order_cursor(cursor) == (updated_at, frontend_hash)
+    print("✅ Order cursors decode to what they encoded")
+
+def test_bad_cursor_raises_value_error():
+    def encoded(raw):
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    bad_cursors = [
+        "not base64!",
+        base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+        encoded("no separator"),
+        encoded("2026-01-02T03:04:05+00:00|not-a-uuid"),
+        encoded(f"yesterday|{uuid.uuid4()}"),
+        encoded(f"2026-01-02|{uuid.uuid4()}|extra"),
+        12345,
+    ]
+    for cursor in bad_cursors:
+        with pytest.raises(ValueError, match="Invalid order cursor"):
+            db_funcs.decode_order_cursor(cursor)
+        # Raised while building the query, before any database access
+        with pytest.raises(ValueError, match="Invalid order cursor"):
+            db_funcs.order_history_statement("user", 10, cursor)
+    print("✅ Malformed cursors raise ValueError")
+
+if __name__ == "__main__":
+    test_cursor_round_trip()
+    test_bad_cursor_raises_value_error()
@@ -1,11 +1,20 @@
 import time, json
-import requests
+import asyncio
+import aiohttp
+import websockets
 import os
+import sys
 from web3 import Web3
 from decimal import Decimal
 from dotenv import load_dotenv
 
-from blockchain_utils import bytes32_to_string, cut_returned_hash, dspy_to_wei, wei_to_dspy, wei_to_usdc
+from blockchain_utils import wei_to_usdc
+from event_decoder import EVENT_ABIS, decode_logs
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+# Deposits are written through the backend's event pipeline, imported on
+# first use so the listener loads without the backend's exchange/database config
+sys.path.append(os.path.join(os.path.dirname(script_dir), "backend"))
 
 load_dotenv()
 
@@ -20,147 +29,453 @@ headers = {
     "Content-Type": "application/json"
 }
 
+# The history API caps a response at this many events
+HISTORY_PAGE_LIMIT = 100
+POLL_INTERVAL_MS = int(os.getenv("LISTENER_POLL_SECONDS", "30")) * 1000
+# Catch-up after downtime advances (and checkpoints) at most this much per request
+MAX_WINDOW_MS = int(os.getenv("LISTENER_MAX_WINDOW_SECONDS", "3600")) * 1000
+# History API requests in flight at once, across all contracts
+LISTENER_MAX_CONCURRENCY = int(os.getenv("LISTENER_MAX_CONCURRENCY", "4"))
+LISTENER_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LISTENER_REQUEST_TIMEOUT_SECONDS", "30"))
+# Per-contract cursors survive restarts here
+CHECKPOINT_FILE = os.getenv("LISTENER_CHECKPOINT_FILE", os.path.join(script_dir, "listener_checkpoint.json"))
+
+# "1inch" polls the history API, "logs" reads eth_getLogs from the node,
+# "ws" streams eth_subscribe("logs") and backfills with eth_getLogs
+LISTENER_MODE = os.getenv("LISTENER_MODE", "1inch")
+RPC_URL = os.getenv("RPC_URL", "https://sepolia.base.org")
+LOGS_POLL_SECONDS = float(os.getenv("LOGS_POLL_SECONDS", "2"))
+# Upper bound for the adaptive eth_getLogs block range
+LOGS_MAX_CHUNK_BLOCKS = int(os.getenv("LOGS_MAX_CHUNK_BLOCKS", "2000"))
+# Blocks to wait before reading a block's logs, for chains that reorg
+LOGS_CONFIRMATIONS = int(os.getenv("LOGS_CONFIRMATIONS", "0"))
+LOGS_CHECKPOINT_KEY = "eth_getLogs"
+# "ws" mode: eth_subscribe("logs") endpoint, defaults to RPC_URL's websocket twin
+WS_RPC_URL = os.getenv("WS_RPC_URL", RPC_URL.replace("https://", "wss://").replace("http://", "ws://"))
+WS_RECONNECT_MAX_SECONDS = float(os.getenv("WS_RECONNECT_MAX_SECONDS", "30"))
+# Logs arriving this close together are recorded as one batch
+WS_BATCH_SECONDS = float(os.getenv("WS_BATCH_SECONDS", "0.1"))
+
+DSPY_UNIT = Decimal(10**9)
+
+# topic0 -> event name of every event the listener decodes
+EVENT_TOPICS = {Web3.to_hex(topic): layout['name'] for topic, layout in EVENT_ABIS.items()}
+
+w3 = Web3(Web3.HTTPProvider(RPC_URL))
+
+def listener_contracts():
+    """
+    Contracts to poll and their cadence in ms.
 
-last_processed_timestamp = int(time.time() * 1000)  # Convert to milliseconds
+    LISTENER_CONTRACTS is "address[:seconds],..."; by default the gateway and
+    token issuer are polled every LISTENER_POLL_SECONDS.
+    """
+    configured = os.getenv("LISTENER_CONTRACTS")
+    if not configured:
+        return {TRANSACTIONGATEWAY_ADDRESS: POLL_INTERVAL_MS, TOKEN_ISSUER_ADDRESS: POLL_INTERVAL_MS}
 
-def get_contract_events(contract_address, from_timestamp_ms, to_timestamp_ms):
+    contracts = {}
+    for entry in configured.split(","):
+        address, _, seconds = entry.strip().partition(":")
+        contracts[address] = int(float(seconds) * 1000) if seconds else POLL_INTERVAL_MS
+    return contracts
+
+async def get_contract_events(session, semaphore, contract_address, from_timestamp_ms, to_timestamp_ms):
     """Get events for a specific contract using 1inch history API"""
     url = f"{INCH_API_BASE}/history/{contract_address}/events"
     
     params = {
-        "limit": 100,
+        "limit": HISTORY_PAGE_LIMIT,
         "chainId": BASE_CHAIN_ID,
         "fromTimestampMs": from_timestamp_ms,
         "toTimestampMs": to_timestamp_ms
     }
     
-    # print(f"🔍 DEBUG - URL: {url}")
-    # print(f"🔍 DEBUG - Params: {params}")
-    
     try:
-        response = requests.get(url, headers=headers, params=params)
-        # print(f"🔍 DEBUG - Response Status: {response.status_code}")
-        if response.status_code != 200:
-            print(f"🔍 DEBUG - Response Text: {response.text}")
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        async with semaphore:
+            async with session.get(url, params=params) as response:
+                if response.status != 200:
+                    print(f"🔍 DEBUG - Response Text: {await response.text()}")
+                response.raise_for_status()
+                return await response.json()
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
         print(f"🚫 1inch API request failed: {e}")
         return None
 
-def decode_event_data(event_data_hex):
-    """Decode event data hex string to get tokenAmount and frontendHash"""
-    try:
-        # Remove '0x' prefix if present
-        if event_data_hex.startswith('0x'):
-            event_data_hex = event_data_hex[2:]
-        
-        # Each parameter is 32 bytes (64 hex chars)
-        # tokenAmount (uint256) - first 32 bytes
-        token_amount_hex = event_data_hex[:64]
-        token_amount = int(token_amount_hex, 16)
-        
-        # frontendHash (bytes32) - next 32 bytes
-        frontend_hash_hex = event_data_hex[64:128]
-        frontend_hash_bytes = bytes.fromhex(frontend_hash_hex)
-        frontend_hash_string = cut_returned_hash(bytes32_to_string(frontend_hash_bytes))
-        
-        return token_amount, frontend_hash_string
-    except Exception as e:
-        print(f"Error decoding event data: {e}")
-        return None, None
-
 def process_events(events_data, contract_address):
-    """Process events from 1inch API response"""
+    """
+    Process events from 1inch API response (or eth_getLogs, same shape).
+
+    Returns:
+        dict: {'usdc': [...], 'dspy': [...]} deposits to hand to record_deposits
+    """
+    deposits = {'usdc': [], 'dspy': []}
     if not events_data or 'items' not in events_data:
         print(f"No events found for {contract_address}")
-        return
-    
-    print(f"📊 Found {len(events_data['items'])} events for {contract_address}")
-    
-    for event in events_data['items']:
-        try:
-            print(f"🔍 Processing event: {event}")
-            
-            event_name = event.get('eventName', '')
-            
-            if event_name in ['StableDeposited', 'ETFDeposited']:
-                user = event['topics'][1] if len(event['topics']) > 1 else None
-                
-                if event_name == 'StableDeposited':
-                    amount_wei, frontend_hash_string = decode_event_data(event['data'])
-                    if amount_wei is not None:
-                        amount = wei_to_usdc(amount_wei)
-                        print(f"\n💰 StableDeposited (via 1inch API):")
-                        print(f"  • user:      {user}")
-                        print(f"  • amount:    {amount}")
-                        print(f"  • frontendHash: {frontend_hash_string}")
-                
-                elif event_name == 'ETFDeposited':
-                    token_amount_wei, frontend_hash_string = decode_event_data(event['data'])
-                    if token_amount_wei is not None:
-                        amount = wei_to_dspy(token_amount_wei)
-                        print(f"\n🪙 ETFDeposited (via 1inch API):")
-                        print(f"  • user:       {user}")
-                        print(f"  • tokenAmount: {amount}")
-                        print(f"  • frontendHash: {frontend_hash_string}")
-            
-            elif event_name in ['MintProcessed', 'BurnProcessed']:
-                user = event['topics'][1] if len(event['topics']) > 1 else None
-                
-                if event_name == 'MintProcessed':
-                    token_amount_wei, frontend_hash_string = decode_event_data(event['data'])
-                    if token_amount_wei is not None:
-                        amount = wei_to_dspy(token_amount_wei)
-                        print(f"\n✨ MintProcessed (via 1inch API):")
-                        print(f"  • user:       {user}")
-                        print(f"  • tokenAmount: {amount}")
-                        print(f"  • frontendHash: {frontend_hash_string}")
-                
-                elif event_name == 'BurnProcessed':
-                    token_amount_wei, frontend_hash_string = decode_event_data(event['data'])
-                    if token_amount_wei is not None:
-                        amount = wei_to_dspy(token_amount_wei)
-                        print(f"\n🔥 BurnProcessed (via 1inch API):")
-                        print(f"  • admin:       {user}")
-                        print(f"  • tokenAmount: {amount}")
-                        print(f"  • frontendHash: {frontend_hash_string}")
-                        
-        except Exception as e:
-            print(f"Error processing event: {e}")
+        return deposits
+
+    # The whole page is decoded in one pass; unknown topics are skipped
+    decoded = decode_logs(events_data['items'])
+    counts = {name: len(columns['transactionHash']) for name, columns in decoded.items()}
+    print(f"📊 Found {len(events_data['items'])} events for {contract_address}: {counts}")
+
+    stable = decoded.get('StableDeposited')
+    if stable:
+        deposits['usdc'] = [
+            (user, wei_to_usdc(amount), str(frontend_hash))
+            for user, amount, frontend_hash in zip(stable['user'], stable['amount'], stable['depositID'])
+        ]
+
+    etf = decoded.get('ETFDeposited')
+    if etf:
+        # The DB keeps exact token amounts, not wei_to_dspy's float
+        deposits['dspy'] = [
+            (user, Decimal(amount) / DSPY_UNIT, str(frontend_hash))
+            for user, amount, frontend_hash in zip(etf['user'], etf['tokenAmount'], etf['depositID'])
+        ]
+
+    # MintProcessed / BurnProcessed are settled by the backend's receipt tracker
+    return deposits
+
+def record_deposits(deposits):
+    """Write a window's deposits into the event pipeline as one batch"""
+    if not deposits['usdc'] and not deposits['dspy']:
+        return True
 
-print(f"🚀 Starting 1inch API polling from timestamp {last_processed_timestamp}")
+    from event_funcs import deposits_received_events
 
+    print(f"📝 Recording {len(deposits['usdc'])} USDC and {len(deposits['dspy'])} DSPY deposits")
+    return deposits_received_events(deposits['usdc'], deposits['dspy']) is not None
 
-while True:
+def load_checkpoints():
+    """Load the per-contract cursors, {contract: {'timestamp_ms', 'recent_keys'}}"""
     try:
-        current_timestamp = int(time.time() * 1000)
-        
-        if current_timestamp > last_processed_timestamp + 30000:  # Check every 30 seconds
-            print(f"📡 Checking events from {last_processed_timestamp} to {current_timestamp} via 1inch API...")
-            
-            # Check TransactionGateway events
-            gateway_events = get_contract_events(
-                TRANSACTIONGATEWAY_ADDRESS, 
-                last_processed_timestamp, 
-                current_timestamp
-            )
-            if gateway_events:
-                process_events(gateway_events, TRANSACTIONGATEWAY_ADDRESS)
-            
-            # Check TokenIssuer events  
-            issuer_events = get_contract_events(
-                TOKEN_ISSUER_ADDRESS,
-                last_processed_timestamp,
-                current_timestamp
-            )
-            if issuer_events:
-                process_events(issuer_events, TOKEN_ISSUER_ADDRESS)
-            
-            last_processed_timestamp = current_timestamp
-        
-        time.sleep(5)  # Poll every 5 seconds
-        
+        with open(CHECKPOINT_FILE) as checkpoint_file:
+            return json.load(checkpoint_file)
+    except FileNotFoundError:
+        return {}
+
+def save_checkpoints(checkpoints):
+    """Write the cursors atomically so a crash never leaves a torn file"""
+    tmp_path = f"{CHECKPOINT_FILE}.tmp"
+    with open(tmp_path, "w") as checkpoint_file:
+        json.dump(checkpoints, checkpoint_file)
+    os.replace(tmp_path, CHECKPOINT_FILE)
+
+def event_key(event):
+    """Identify an event across overlapping windows"""
+    tx_hash = event.get('transactionHash') or event.get('txHash')
+    log_index = event.get('logIndex')
+    if tx_hash is None:
+        return json.dumps(event, sort_keys=True)
+    return f"{tx_hash}:{log_index}"
+
+async def get_window_events(session, semaphore, contract_address, from_timestamp_ms, to_timestamp_ms):
+    """
+    Get every event of a window, splitting it while a response is truncated.
+
+    Returns None if any request failed, so the caller can retry the window.
+    """
+    events_data = await get_contract_events(session, semaphore, contract_address, from_timestamp_ms, to_timestamp_ms)
+    if events_data is None:
+        return None
+
+    items = events_data.get('items', [])
+    if len(items) < HISTORY_PAGE_LIMIT:
+        return items
+
+    if to_timestamp_ms - from_timestamp_ms <= 1:
+        print(f"⚠️ {len(items)} events at {from_timestamp_ms} for {contract_address}, some may be missing")
+        return items
+
+    middle_ms = (from_timestamp_ms + to_timestamp_ms) // 2
+    first_half, second_half = await asyncio.gather(
+        get_window_events(session, semaphore, contract_address, from_timestamp_ms, middle_ms),
+        get_window_events(session, semaphore, contract_address, middle_ms, to_timestamp_ms),
+    )
+    if first_half is None or second_half is None:
+        return None
+    return first_half + second_half
+
+async def poll_contract(session, semaphore, contract_address, checkpoint, current_timestamp):
+    """Process the next window after the checkpoint and return the new checkpoint"""
+    from_timestamp_ms = checkpoint['timestamp_ms']
+    to_timestamp_ms = min(current_timestamp, from_timestamp_ms + MAX_WINDOW_MS)
+
+    print(f"📡 Checking events from {from_timestamp_ms} to {to_timestamp_ms} for {contract_address} via 1inch API...")
+    items = await get_window_events(session, semaphore, contract_address, from_timestamp_ms, to_timestamp_ms)
+    if items is None:
+        # Keep the cursor, the same window is retried next cycle
+        return checkpoint
+
+    # Windows overlap at their edges, so drop anything already processed
+    seen = set(checkpoint.get('recent_keys', []))
+    new_items = {}
+    for event in items:
+        key = event_key(event)
+        if key not in seen:
+            new_items.setdefault(key, event)
+
+    if new_items:
+        deposits = process_events({'items': list(new_items.values())}, contract_address)
+        # Deposits already recorded are skipped, so the window can be retried
+        if not await asyncio.to_thread(record_deposits, deposits):
+            return checkpoint
+
+    return {
+        'timestamp_ms': to_timestamp_ms,
+        'recent_keys': [event_key(event) for event in items],
+    }
+
+def log_to_event(log):
+    """Shape a raw RPC log like a history API item"""
+    topics = [Web3.to_hex(topic) for topic in log['topics']]
+    return {
+        'eventName': EVENT_TOPICS.get(topics[0], '') if topics else '',
+        'topics': topics,
+        'data': Web3.to_hex(log['data']),
+        'transactionHash': Web3.to_hex(log['transactionHash']),
+        'logIndex': log['logIndex'],
+        'blockNumber': log['blockNumber'],
+        'address': Web3.to_checksum_address(log['address']),
+    }
+
+def get_log_events(contracts, from_block, to_block):
+    """Get the listened-for events of a block range straight from the node"""
+    logs = w3.eth.get_logs({
+        'fromBlock': from_block,
+        'toBlock': to_block,
+        'address': [Web3.to_checksum_address(c) for c in contracts],
+        # Any of our event signatures in topic0
+        'topics': [list(EVENT_TOPICS)],
+    })
+    return [log_to_event(log) for log in logs]
+
+def poll_logs(contracts, checkpoint, chunk_blocks):
+    """
+    Process the next block range after the checkpoint.
+
+    The range doubles after every success and halves whenever the node
+    rejects it (too many results, range limits, timeouts).
+
+    Returns:
+        tuple: (new checkpoint, next chunk size, whether we reached the head)
+    """
+    latest_block = w3.eth.block_number - LOGS_CONFIRMATIONS
+    from_block = checkpoint['block'] + 1
+    if from_block > latest_block:
+        return checkpoint, chunk_blocks, True
+
+    to_block = min(latest_block, from_block + chunk_blocks - 1)
+    try:
+        events = get_log_events(contracts, from_block, to_block)
     except Exception as e:
-        print(f"‼️ Unexpected error: {type(e).__name__}: {e}")
-        time.sleep(5)
+        if chunk_blocks == 1:
+            raise
+        print(f"⚠️ eth_getLogs {from_block}-{to_block} rejected ({e}), shrinking range")
+        return checkpoint, max(1, chunk_blocks // 2), False
+
+    by_contract = {}
+    for event in events:
+        by_contract.setdefault(event['address'], []).append(event)
+
+    deposits = {'usdc': [], 'dspy': []}
+    for contract_address, items in by_contract.items():
+        contract_deposits = process_events({'items': items}, contract_address)
+        deposits['usdc'] += contract_deposits['usdc']
+        deposits['dspy'] += contract_deposits['dspy']
+
+    # The whole range is one batch; on failure it is retried from the checkpoint
+    if not record_deposits(deposits):
+        raise RuntimeError(f"Failed to record deposits of blocks {from_block}-{to_block}")
+
+    return {'block': to_block}, min(chunk_blocks * 2, LOGS_MAX_CHUNK_BLOCKS), to_block >= latest_block
+
+def ensure_logs_checkpoint(checkpoints):
+    if LOGS_CHECKPOINT_KEY not in checkpoints:
+        start_block = os.getenv("LISTENER_START_BLOCK")
+        start_block = int(start_block) if start_block else w3.eth.block_number - LOGS_CONFIRMATIONS
+        checkpoints[LOGS_CHECKPOINT_KEY] = {'block': start_block - 1}
+
+def run_logs_listener(contracts, checkpoints):
+    ensure_logs_checkpoint(checkpoints)
+    print(f"🚀 Starting eth_getLogs polling from block {checkpoints[LOGS_CHECKPOINT_KEY]['block'] + 1}")
+
+    chunk_blocks = LOGS_MAX_CHUNK_BLOCKS
+    while True:
+        try:
+            checkpoint, chunk_blocks, caught_up = poll_logs(contracts, checkpoints[LOGS_CHECKPOINT_KEY], chunk_blocks)
+            if checkpoint is not checkpoints[LOGS_CHECKPOINT_KEY]:
+                checkpoints[LOGS_CHECKPOINT_KEY] = checkpoint
+                save_checkpoints(checkpoints)
+
+            # Catch up without pausing, then wait about a block
+            if caught_up:
+                time.sleep(LOGS_POLL_SECONDS)
+
+        except Exception as e:
+            print(f"‼️ Unexpected error: {type(e).__name__}: {e}")
+            time.sleep(5)
+
+def ws_log_to_event(log):
+    """Shape an eth_subscribe log (hex-encoded JSON) like log_to_event's output"""
+    topics = log['topics']
+    return {
+        'eventName': EVENT_TOPICS.get(topics[0], '') if topics else '',
+        'topics': topics,
+        'data': log['data'],
+        'transactionHash': log['transactionHash'],
+        'logIndex': int(log['logIndex'], 16),
+        'blockNumber': int(log['blockNumber'], 16),
+        'address': Web3.to_checksum_address(log['address']),
+    }
+
+async def ws_request(ws, request_id, method, params, notifications):
+    """JSON-RPC call over the socket; notifications read meanwhile are kept in order"""
+    await ws.send(json.dumps({'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}))
+    while True:
+        message = json.loads(await ws.recv())
+        if message.get('id') == request_id:
+            if 'error' in message:
+                raise RuntimeError(f"{method} failed: {message['error']}")
+            return message['result']
+        notifications.append(message)
+
+async def backfill_logs(contracts, checkpoints):
+    """eth_getLogs from the checkpoint up to the head, as in "logs" mode"""
+    chunk_blocks, caught_up = LOGS_MAX_CHUNK_BLOCKS, False
+    while not caught_up:
+        checkpoint, chunk_blocks, caught_up = await asyncio.to_thread(
+            poll_logs, contracts, checkpoints[LOGS_CHECKPOINT_KEY], chunk_blocks
+        )
+        if checkpoint is not checkpoints[LOGS_CHECKPOINT_KEY]:
+            checkpoints[LOGS_CHECKPOINT_KEY] = checkpoint
+            save_checkpoints(checkpoints)
+
+async def process_ws_logs(logs, checkpoints):
+    by_contract = {}
+    for log in logs:
+        # Logs of reorged-out blocks are sent again with removed=true
+        if log.get('removed'):
+            continue
+        event = ws_log_to_event(log)
+        by_contract.setdefault(event['address'], []).append(event)
+
+    deposits = {'usdc': [], 'dspy': []}
+    for contract_address, items in by_contract.items():
+        contract_deposits = process_events({'items': items}, contract_address)
+        deposits['usdc'] += contract_deposits['usdc']
+        deposits['dspy'] += contract_deposits['dspy']
+
+    if not await asyncio.to_thread(record_deposits, deposits):
+        raise RuntimeError("Failed to record streamed deposits")
+
+    # A block's logs may still be arriving, so resume at its start after a reconnect
+    last_block = max(int(log['blockNumber'], 16) for log in logs) - 1
+    if last_block > checkpoints[LOGS_CHECKPOINT_KEY]['block']:
+        checkpoints[LOGS_CHECKPOINT_KEY] = {'block': last_block}
+        save_checkpoints(checkpoints)
+
+async def stream_logs(contracts, checkpoints, ws_url=WS_RPC_URL):
+    """One websocket session: subscribe, backfill the gap, then stream"""
+    async with websockets.connect(ws_url, ping_interval=20, max_size=None) as ws:
+        notifications = []
+        subscription = await ws_request(ws, 1, 'eth_subscribe', ['logs', {
+            'address': [Web3.to_checksum_address(c) for c in contracts],
+            'topics': [list(EVENT_TOPICS)],
+        }], notifications)
+        print(f"🔌 Subscribed to logs on {ws_url}")
+
+        # Subscribing first means nothing falls between the backfill and the
+        # stream; logs seen by both are recorded once thanks to the stage checks
+        await backfill_logs(contracts, checkpoints)
+
+        while True:
+            if not notifications:
+                notifications.append(json.loads(await ws.recv()))
+            # Pick up whatever else arrives right behind it
+            try:
+                while len(notifications) < 1000:
+                    notifications.append(json.loads(await asyncio.wait_for(ws.recv(), WS_BATCH_SECONDS)))
+            except asyncio.TimeoutError:
+                pass
+
+            logs = [
+                message['params']['result'] for message in notifications
+                if message.get('method') == 'eth_subscription' and message['params'].get('subscription') == subscription
+            ]
+            notifications = []
+            if logs:
+                await process_ws_logs(logs, checkpoints)
+
+async def run_ws_listener(contracts, checkpoints, ws_url=WS_RPC_URL):
+    await asyncio.to_thread(ensure_logs_checkpoint, checkpoints)
+    print(f"🚀 Starting log subscription from block {checkpoints[LOGS_CHECKPOINT_KEY]['block'] + 1}")
+
+    delay = 1
+    while True:
+        started = time.monotonic()
+        try:
+            await stream_logs(contracts, checkpoints, ws_url)
+        except Exception as e:
+            print(f"‼️ Log subscription dropped: {type(e).__name__}: {e}")
+
+        # Back off while the endpoint keeps failing, reset after a healthy session
+        delay = 1 if time.monotonic() - started > WS_RECONNECT_MAX_SECONDS else min(delay * 2, WS_RECONNECT_MAX_SECONDS)
+        await asyncio.sleep(delay)
+
+async def run_contract_poller(session, semaphore, contract_address, interval_ms, checkpoints):
+    """Poll one contract on its own cadence, independently of the others"""
+    while True:
+        try:
+            current_timestamp = int(time.time() * 1000)
+            checkpoint = checkpoints[contract_address]
+            due_in_ms = checkpoint['timestamp_ms'] + interval_ms - current_timestamp
+            if due_in_ms > 0:
+                await asyncio.sleep(due_in_ms / 1000)
+                continue
+
+            new_checkpoint = await poll_contract(session, semaphore, contract_address, checkpoint, current_timestamp)
+            if new_checkpoint is checkpoint:
+                # Failed window, retried after the pause
+                await asyncio.sleep(5)
+                continue
+
+            checkpoints[contract_address] = new_checkpoint
+            save_checkpoints(checkpoints)
+            # Still behind: go straight on to the next catch-up window
+
+        except Exception as e:
+            print(f"‼️ Unexpected error for {contract_address}: {type(e).__name__}: {e}")
+            await asyncio.sleep(5)
+
+async def run_history_listener(contracts, checkpoints):
+    start_timestamp = int(time.time() * 1000)  # Convert to milliseconds
+    for contract_address in contracts:
+        if contract_address not in checkpoints:
+            checkpoints[contract_address] = {'timestamp_ms': start_timestamp, 'recent_keys': []}
+        print(f"🚀 Starting 1inch API polling for {contract_address} from timestamp {checkpoints[contract_address]['timestamp_ms']}")
+
+    # One keep-alive session and one request budget shared by every contract
+    semaphore = asyncio.Semaphore(LISTENER_MAX_CONCURRENCY)
+    connector = aiohttp.TCPConnector(limit=LISTENER_MAX_CONCURRENCY)
+    timeout = aiohttp.ClientTimeout(total=LISTENER_REQUEST_TIMEOUT_SECONDS)
+    async with aiohttp.ClientSession(headers=headers, connector=connector, timeout=timeout) as session:
+        await asyncio.gather(*[
+            run_contract_poller(session, semaphore, contract_address, interval_ms, checkpoints)
+            for contract_address, interval_ms in contracts.items()
+        ])
+
+def main():
+    contracts = listener_contracts()
+    checkpoints = load_checkpoints()
+
+    if LISTENER_MODE == "logs":
+        run_logs_listener(list(contracts), checkpoints)
+    elif LISTENER_MODE == "ws":
+        asyncio.run(run_ws_listener(list(contracts), checkpoints))
+    else:
+        asyncio.run(run_history_listener(contracts, checkpoints))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import os
+import json
+import glob
+import uuid
+from web3 import Web3
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Events the listener acts on; others in the ABIs are skipped unless asked for
+LISTENED_EVENTS = ('StableDeposited', 'ETFDeposited', 'MintProcessed', 'BurnProcessed')
+
+STATIC_TYPES = ('uint', 'int', 'address', 'bool', 'bytes32')
+
+def is_static_type(abi_type):
+    return abi_type.startswith(STATIC_TYPES) and not abi_type.endswith(']')
+
+def load_event_abis(abi_dir=os.path.join(script_dir, "abi"), event_names=LISTENED_EVENTS):
+    """
+    Build topic0 -> event layout from every abi/*.json.
+
+    Only events made of single-word (static) inputs are kept, which lets a
+    log be decoded by slicing 32-byte words instead of running a full ABI
+    decoder.
+    """
+    events = {}
+    for abi_path in sorted(glob.glob(os.path.join(abi_dir, "*.json"))):
+        with open(abi_path) as abi_file:
+            abi = json.load(abi_file)
+        for entry in abi:
+            if entry.get('type') != 'event' or entry.get('anonymous'):
+                continue
+            if event_names is not None and entry['name'] not in event_names:
+                continue
+            if not all(is_static_type(i['type']) for i in entry['inputs']):
+                continue
+
+            signature = f"{entry['name']}({','.join(i['type'] for i in entry['inputs'])})"
+            events[bytes(Web3.keccak(text=signature))] = {
+                'name': entry['name'],
+                'indexed': [(i['name'], i['type']) for i in entry['inputs'] if i['indexed']],
+                'data': [(i['name'], i['type']) for i in entry['inputs'] if not i['indexed']],
+            }
+    return events
+
+EVENT_ABIS = load_event_abis()
+
+def to_bytes(value):
+    # 1inch items carry hex strings, web3 logs carry HexBytes
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith('0x') else value)
+    return bytes(value)
+
+def word_decoder(abi_type):
+    if abi_type == 'address':
+        return lambda word: '0x' + word[12:].hex()
+    if abi_type == 'bytes32':
+        # Frontend hashes are UUIDs, left-aligned and zero-padded to 32 bytes
+        return lambda word: uuid.UUID(bytes=word[:16])
+    if abi_type == 'bool':
+        return lambda word: word[31] == 1
+    if abi_type.startswith('int'):
+        return lambda word: int.from_bytes(word, 'big', signed=True)
+    return lambda word: int.from_bytes(word, 'big')
+
+def decode_logs(logs, event_abis=EVENT_ABIS):
+    """
+    Decode a whole page of raw logs at once.
+
+    Args:
+        logs: history API items or eth_getLogs results ('topics', 'data', and
+            optionally 'transactionHash', 'logIndex', 'blockNumber')
+
+    Returns:
+        dict: event name -> {input name: [values], ...} columns, with amounts
+        as ints, addresses as lowercase hex and bytes32 hashes as uuid.UUID.
+        Logs with an unknown topic0 are skipped.
+    """
+    # topic0 -> (columns, [(column, decoder, topic index)], [(column, decoder, data offset)])
+    plans = {}
+    decoded = {}
+    for log in logs:
+        topics = log.get('topics')
+        if not topics:
+            continue
+        topic0 = topics[0]
+        plan = plans.get(topic0)
+        if plan is None:
+            layout = event_abis.get(to_bytes(topic0))
+            if layout is None:
+                plans[topic0] = plan = False
+            else:
+                columns = decoded.setdefault(layout['name'], {
+                    **{name: [] for name, _ in layout['indexed'] + layout['data']},
+                    'transactionHash': [], 'logIndex': [], 'blockNumber': [],
+                })
+                plans[topic0] = plan = (
+                    columns,
+                    [(columns[name], word_decoder(abi_type), i + 1) for i, (name, abi_type) in enumerate(layout['indexed'])],
+                    [(columns[name], word_decoder(abi_type), i * 32) for i, (name, abi_type) in enumerate(layout['data'])],
+                )
+        if plan is False:
+            continue
+
+        columns, indexed, data_words = plan
+        for column, decode, i in indexed:
+            column.append(decode(to_bytes(topics[i])))
+        data = to_bytes(log.get('data') or b'')
+        for column, decode, offset in data_words:
+            column.append(decode(data[offset:offset + 32]))
+
+        tx_hash = log.get('transactionHash') or log.get('txHash')
+        columns['transactionHash'].append(tx_hash if tx_hash is None or isinstance(tx_hash, str) else Web3.to_hex(tx_hash))
+        columns['logIndex'].append(log.get('logIndex'))
+        columns['blockNumber'].append(log.get('blockNumber'))
+
+    return decoded
@@ -0,0 +1,93 @@
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+import importlib
+import pytest
+from web3 import Web3
+
+# Local dev chain for exercising the event listener without a public endpoint.
+# Needs foundry's anvil on PATH (or ANVIL_BIN).
+
+ANVIL_BIN = os.getenv("ANVIL_BIN", "anvil")
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+contracts_dir = os.path.dirname(script_dir)
+
+requires_anvil = pytest.mark.skipif(shutil.which(ANVIL_BIN) is None, reason="anvil is not installed")
+
+# Runtime: LOG2(data=calldata[64:], topic0=calldata[0:32], topic1=calldata[32:64])
+#   CALLDATASIZE PUSH1 0 PUSH1 0 CALLDATACOPY
+#   PUSH1 0x20 MLOAD  PUSH1 0 MLOAD  PUSH1 0x40 CALLDATASIZE SUB  PUSH1 0x40  LOG2  STOP
+EMITTER_RUNTIME = "366000600037" + "602051" + "600051" + "60403603" + "6040" + "a2" + "00"
+# Init: CODECOPY the 20-byte runtime that follows these 12 bytes and RETURN it
+EMITTER_BYTECODE = "0x" + "6014600c60003960146000f3" + EMITTER_RUNTIME
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_anvil(block_time=None):
+    """Spawn anvil and return (process, http url, ws url)"""
+    port = free_port()
+    args = [ANVIL_BIN, "--port", str(port), "--silent"]
+    if block_time:
+        args += ["--block-time", str(block_time)]
+    process = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    http_url = f"http://127.0.0.1:{port}"
+    w3 = Web3(Web3.HTTPProvider(http_url))
+    for _ in range(100):
+        try:
+            if w3.is_connected():
+                return process, http_url, f"ws://127.0.0.1:{port}"
+        except Exception:
+            pass
+        time.sleep(0.1)
+
+    process.terminate()
+    raise RuntimeError(f"anvil did not start on port {port}")
+
+def stop_anvil(process):
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+def deploy_emitter(w3):
+    """Deploy the log emitter from anvil's first (unlocked) account"""
+    tx_hash = w3.eth.send_transaction({'from': w3.eth.accounts[0], 'data': EMITTER_BYTECODE})
+    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    return receipt['contractAddress']
+
+def emit_event(w3, emitter, topic0, user, amount, frontend_hash):
+    """Emit an event shaped like StableDeposited / MintProcessed: (indexed address, uint256, bytes32)"""
+    calldata = (
+        Web3.to_bytes(hexstr=topic0)
+        + bytes(12) + Web3.to_bytes(hexstr=user)
+        + amount.to_bytes(32, "big")
+        + frontend_hash
+    )
+    tx_hash = w3.eth.send_transaction({'from': w3.eth.accounts[0], 'to': emitter, 'data': Web3.to_hex(calldata)})
+    return w3.eth.wait_for_transaction_receipt(tx_hash)
+
+def load_listener(monkeypatch, http_url, ws_url, emitter):
+    """
+    Import blockchain_event_listener pointed at the local chain.
+
+    The listener reads its config at import, so the module is reloaded on
+    every call; an earlier test's chain, checkpoint file and patched
+    functions never carry over.
+    """
+    monkeypatch.setenv("RPC_URL", http_url)
+    monkeypatch.setenv("WS_RPC_URL", ws_url)
+    monkeypatch.setenv("TRANSACTIONGATEWAY_ADDRESS", emitter)
+    monkeypatch.setenv("DSPY_ADDRESS", emitter)
+    monkeypatch.setenv("LISTENER_CHECKPOINT_FILE", os.path.join(tempfile.mkdtemp(), "checkpoint.json"))
+    monkeypatch.syspath_prepend(contracts_dir)
+    import blockchain_event_listener
+    return importlib.reload(blockchain_event_listener)
@@ -0,0 +1,107 @@
+import os
+import sys
+import json
+import time
+import uuid
+import tempfile
+from hexbytes import HexBytes
+from web3 import Web3
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+contracts_dir = os.path.dirname(script_dir)
+sys.path.insert(0, contracts_dir)
+
+from event_decoder import decode_logs, load_event_abis
+
+USER_ADDRESS = "0x000000000000000000000000000000000000dEaD"
+STABLE_DEPOSITED = Web3.to_hex(Web3.keccak(text="StableDeposited(address,uint256,bytes32)"))
+
+def word(value):
+    return value.to_bytes(32, "big", signed=value < 0)
+
+def stable_deposited_log(amount, frontend_hash, log_index=0):
+    """A StableDeposited log the way the 1inch history API returns it: hex strings"""
+    return {
+        'topics': [STABLE_DEPOSITED, Web3.to_hex(bytes(12) + Web3.to_bytes(hexstr=USER_ADDRESS))],
+        'data': Web3.to_hex(word(amount) + frontend_hash.bytes + bytes(16)),
+        'transactionHash': Web3.to_hex(Web3.keccak(text=str(frontend_hash))),
+        'logIndex': log_index,
+        'blockNumber': 7,
+    }
+
+def as_web3_log(log):
+    """The same log the way web3's eth_getLogs returns it: HexBytes"""
+    return dict(
+        log,
+        topics=[HexBytes(topic) for topic in log['topics']],
+        data=HexBytes(log['data']),
+        transactionHash=HexBytes(log['transactionHash']),
+    )
+
+def test_unknown_topic0_is_skipped():
+    frontend_hash = uuid.uuid4()
+    other = dict(stable_deposited_log(1, uuid.uuid4()), topics=[Web3.to_hex(Web3.keccak(text="Other(address,uint256,bytes32)"))])
+    decoded = decode_logs([other, {'topics': [], 'data': '0x'}, stable_deposited_log(5, frontend_hash)])
+
+    assert list(decoded) == ['StableDeposited']
+    assert decoded['StableDeposited']['amount'] == [5]
+    assert decoded['StableDeposited']['depositID'] == [frontend_hash]
+    print("✅ Logs with an unknown topic0 are skipped")
+
+def test_hex_strings_and_hexbytes_decode_alike():
+    logs = [stable_deposited_log((i + 1) * 10**6, uuid.uuid4(), i) for i in range(3)]
+    from_history_api = decode_logs(logs)
+    from_eth_getLogs = decode_logs([as_web3_log(log) for log in logs])
+
+    assert from_history_api == from_eth_getLogs
+    assert from_history_api['StableDeposited']['user'] == [USER_ADDRESS.lower()] * 3
+    assert from_history_api['StableDeposited']['transactionHash'] == [log['transactionHash'] for log in logs]
+    print("✅ 1inch hex-string items and web3 HexBytes logs decode the same")
+
+def test_bytes32_decodes_to_uuid():
+    frontend_hash = uuid.uuid4()
+    decoded = decode_logs([stable_deposited_log(1, frontend_hash)])
+
+    deposit_id = decoded['StableDeposited']['depositID'][0]
+    assert isinstance(deposit_id, uuid.UUID)
+    assert deposit_id == frontend_hash
+    print("✅ bytes32 frontend hashes decode to their UUID")
+
+def test_signed_int_word():
+    abi = [{
+        'type': 'event', 'name': 'Adjusted', 'anonymous': False,
+        'inputs': [
+            {'name': 'user', 'type': 'address', 'indexed': True},
+            {'name': 'delta', 'type': 'int256', 'indexed': False},
+            {'name': 'total', 'type': 'uint256', 'indexed': False},
+        ],
+    }]
+    abi_dir = tempfile.mkdtemp()
+    with open(os.path.join(abi_dir, "AdjusterABI.json"), "w") as abi_file:
+        json.dump(abi, abi_file)
+    event_abis = load_event_abis(abi_dir, event_names=None)
+
+    log = {
+        'topics': [Web3.to_hex(Web3.keccak(text="Adjusted(address,int256,uint256)")), Web3.to_hex(bytes(12) + Web3.to_bytes(hexstr=USER_ADDRESS))],
+        'data': Web3.to_hex(word(-5) + word(2**255)),
+    }
+    decoded = decode_logs([log], event_abis)
+
+    assert decoded['Adjusted']['delta'] == [-5]
+    assert decoded['Adjusted']['total'] == [2**255]
+    print("✅ int words decode signed, uint words unsigned")
+
+def benchmark_decode_logs(count=300_000):
+    logs = [stable_deposited_log(i + 1, uuid.uuid4(), i) for i in range(count)]
+    start = time.perf_counter()
+    decoded = decode_logs(logs)
+    elapsed = time.perf_counter() - start
+    assert len(decoded['StableDeposited']['amount']) == count
+    print(f"⏱ Decoded {count} StableDeposited logs in {elapsed:.2f}s")
+
+if __name__ == "__main__":
+    test_unknown_topic0_is_skipped()
+    test_hex_strings_and_hexbytes_decode_alike()
+    test_bytes32_decodes_to_uuid()
+    test_signed_int_word()
+    benchmark_decode_logs()
@@ -0,0 +1,72 @@
+import asyncio
+import uuid
+import pytest
+from web3 import Web3
+from local_chain import start_anvil, stop_anvil, deploy_emitter, emit_event, load_listener, requires_anvil
+
+USER_ADDRESS = "0x000000000000000000000000000000000000dEaD"
+
+async def wait_for(condition, timeout=10):
+    for _ in range(int(timeout / 0.1)):
+        if condition():
+            return
+        await asyncio.sleep(0.1)
+    raise AssertionError("timed out")
+
+async def run_websocket_checks(w3, ws_url, emitter, listener, recorded):
+    topics = {name: topic for topic, name in listener.EVENT_TOPICS.items()}
+
+    checkpoints = {}
+    task = asyncio.create_task(listener.run_ws_listener([emitter], checkpoints, ws_url))
+    await wait_for(lambda: listener.LOGS_CHECKPOINT_KEY in checkpoints)
+    await asyncio.sleep(1)
+
+    # Streamed while subscribed
+    live_hash = uuid.uuid4()
+    await asyncio.to_thread(emit_event, w3, emitter, topics['StableDeposited'], USER_ADDRESS, 5 * 10**6, live_hash.bytes + bytes(16))
+    await wait_for(lambda: any(h == str(live_hash) for _, _, h in recorded))
+    print("✅ Streamed deposit received over eth_subscribe")
+
+    # Listener down while deposits land, then back up with the same checkpoint
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    missed_hashes = [uuid.uuid4() for _ in range(3)]
+    for frontend_hash in missed_hashes:
+        await asyncio.to_thread(emit_event, w3, emitter, topics['StableDeposited'], USER_ADDRESS, 10**6, frontend_hash.bytes + bytes(16))
+
+    task = asyncio.create_task(listener.run_ws_listener([emitter], checkpoints, ws_url))
+    await wait_for(lambda: all(any(h == str(m) for _, _, h in recorded) for m in missed_hashes))
+    print("✅ Deposits made while disconnected were backfilled after reconnecting")
+
+    after_hash = uuid.uuid4()
+    await asyncio.to_thread(emit_event, w3, emitter, topics['StableDeposited'], USER_ADDRESS, 10**6, after_hash.bytes + bytes(16))
+    await wait_for(lambda: any(h == str(after_hash) for _, _, h in recorded))
+    print("✅ Streaming resumed after the backfill")
+
+    task.cancel()
+
+@requires_anvil
+def test_websocket_subscription(monkeypatch):
+    process, http_url, ws_url = start_anvil()
+    try:
+        w3 = Web3(Web3.HTTPProvider(http_url))
+        emitter = deploy_emitter(w3)
+
+        listener = load_listener(monkeypatch, http_url, ws_url, emitter)
+
+        recorded = []
+        def collect_deposits(deposits):
+            recorded.extend(deposits['usdc'])
+            return True
+        monkeypatch.setattr(listener, "record_deposits", collect_deposits)
+
+        asyncio.run(run_websocket_checks(w3, ws_url, emitter, listener, recorded))
+    finally:
+        stop_anvil(process)
+
+if __name__ == "__main__":
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_websocket_subscription(monkeypatch)